@@ -0,0 +1,101 @@
+# Fast flattening of nested alert payloads.
+#
+# Alerts of one type almost always have the same shape, e.g. every dependabot alert has
+# dependency.package.name and security_advisory.cvss.score. Instead of walking every alert
+# recursively, AlertFlattener learns the key paths of an alert once and compiles them into a
+# plain Python function that builds the flat dict in a single expression. The compiled plan
+# checks that the alert still has the learned shape (same keys at every level, nested objects
+# still objects, leaves still not objects). Alerts with a different shape (e.g. dismissed_by
+# set instead of null) get their own plan, so the result is always the same as flatten_dict.
+#
+# Nested keys are joined with '_', e.g. {'dependency': {'package': {'name': 'x'}}} becomes
+# {'dependency_package_name': 'x'}. Empty objects produce no keys and lists are kept as-is.
+
+# Alert payloads seen in practice have only a handful of shapes per alert type (nullable
+# objects like dismissed_by, optional blocks like security_advisory.cvss_severities).
+MAX_PLANS = 32
+
+
+# Generic non-recursive flattener, used to learn new shapes and as the fallback when an
+# alert has more shapes than MAX_PLANS.
+def flatten_dict(d, sep='_'):
+    flat = {}
+    stack = [('', iter(d.items()))]
+    while stack:
+        prefix, items = stack[-1]
+        for k, v in items:
+            key = f"{prefix}{sep}{k}" if prefix else k
+            if isinstance(v, dict):
+                stack.append((key, iter(v.items())))
+                break
+            flat[key] = v
+        else:
+            stack.pop()
+    return flat
+
+
+# Builds the source of a function that flattens dicts with exactly the shape of `sample`.
+# Returns the source and the key sets it compares against.
+def compile_plan_source(sample, sep='_'):
+    lines = ['def plan(d):']
+    key_sets = []
+    leaves = []
+    checks = []
+
+    # Nodes are visited in insertion order so the flat dict has the same key order as flatten_dict
+    def visit(node, var, prefix):
+        key_sets.append(frozenset(node))
+        lines.append(f'    if {var}.keys() != K[{len(key_sets) - 1}]: return None')
+        for k, v in node.items():
+            key = f"{prefix}{sep}{k}" if prefix else k
+            if isinstance(v, dict):
+                child = f'n{len(key_sets)}'
+                lines.append(f'    {child} = {var}[{k!r}]')
+                lines.append(f'    if {child}.__class__ is not dict: return None')
+                visit(v, child, key)
+            else:
+                leaf = f'v{len(leaves)}'
+                lines.append(f'    {leaf} = {var}[{k!r}]')
+                checks.append(f'{leaf}.__class__ is dict')
+                leaves.append((key, leaf))
+
+    visit(sample, 'd', '')
+    if checks:
+        lines.append(f"    if {' or '.join(checks)}: return None")
+    items = ', '.join(f'{key!r}: {leaf}' for key, leaf in leaves)
+    lines.append(f'    return {{{items}}}')
+    return '\n'.join(lines), key_sets
+
+
+def compile_plan(sample, sep='_'):
+    source, key_sets = compile_plan_source(sample, sep)
+    namespace = {'K': key_sets}
+    exec(compile(source, '<alert_flattener plan>', 'exec'), namespace)
+    return namespace['plan']
+
+
+# Flattens alerts using compiled plans learned from the alerts themselves.
+# Use one AlertFlattener per alert type (and per thread), e.g.
+#   flattener = AlertFlattener()
+#   rows = (flattener.flatten(alert) for alert in alerts)
+class AlertFlattener:
+    def __init__(self, sep='_', max_plans=MAX_PLANS):
+        self.sep = sep
+        self.max_plans = max_plans
+        self.plans = []
+
+    def flatten(self, alert):
+        # The plan that matched last is tried first, which is almost always a hit
+        plans = self.plans
+        for i, plan in enumerate(plans):
+            flat = plan(alert)
+            if flat is not None:
+                if i:
+                    plans.insert(0, plans.pop(i))
+                return flat
+
+        if len(plans) < self.max_plans:
+            plans.insert(0, compile_plan(alert, self.sep))
+        return flatten_dict(alert, self.sep)
+
+    __call__ = flatten
@@ -0,0 +1,95 @@
+import json
+
+# Stable CSV schemas for flattened security alerts.
+#
+# The columns of each alert type are declared up front instead of being discovered from
+# the data, so alerts can be written in a single streaming pass with a correct header.
+# Keys that are not part of the schema (new fields added by GitHub, or the extra fields of
+# nested objects such as dismissed_by) are written as a JSON object in the extra_fields
+# column, so nothing is lost and the columns always line up.
+#
+# Field names follow the flattened alert payloads (nested keys joined with '_'), see
+# pull_all_repo_security_alerts/ghas-security-alerts-erd.md.
+
+EXTRA_FIELDS_COLUMN = 'extra_fields'
+
+DEPENDABOT_FIELDS = [
+    'number', 'state', 'dependency_package_ecosystem', 'dependency_package_name', 'dependency_manifest_path',
+    'dependency_scope', 'security_advisory_ghsa_id', 'security_advisory_cve_id', 'security_advisory_summary',
+    'security_advisory_description', 'security_advisory_severity', 'security_advisory_identifiers',
+    'security_advisory_references', 'security_advisory_published_at', 'security_advisory_updated_at',
+    'security_advisory_withdrawn_at', 'security_advisory_vulnerabilities', 'security_advisory_cvss_vector_string',
+    'security_advisory_cvss_score', 'security_advisory_cwes', 'security_vulnerability_package_ecosystem',
+    'security_vulnerability_package_name', 'security_vulnerability_severity',
+    'security_vulnerability_vulnerable_version_range', 'security_vulnerability_first_patched_version',
+    'security_vulnerability_first_patched_version_identifier', 'url', 'html_url', 'created_at', 'updated_at',
+    'dismissed_at', 'dismissed_by', 'dismissed_by_login', 'dismissed_reason', 'dismissed_comment', 'fixed_at',
+    'auto_dismissed_at'
+]
+
+CODE_SCANNING_FIELDS = [
+    'number', 'created_at', 'updated_at', 'url', 'html_url', 'state', 'fixed_at', 'dismissed_by',
+    'dismissed_by_login', 'dismissed_at', 'dismissed_reason', 'dismissed_comment', 'rule_id', 'rule_severity',
+    'rule_description', 'rule_name', 'rule_tags', 'rule_security_severity_level', 'tool_name', 'tool_guid',
+    'tool_version', 'most_recent_instance_ref', 'most_recent_instance_analysis_key',
+    'most_recent_instance_environment', 'most_recent_instance_category', 'most_recent_instance_state',
+    'most_recent_instance_commit_sha', 'most_recent_instance_message_text', 'most_recent_instance_location_path',
+    'most_recent_instance_location_start_line', 'most_recent_instance_location_end_line',
+    'most_recent_instance_location_start_column', 'most_recent_instance_location_end_column',
+    'most_recent_instance_classifications', 'instances_url'
+]
+
+SECRET_FIELDS = [
+    'number', 'created_at', 'updated_at', 'url', 'html_url', 'locations_url', 'state', 'secret_type',
+    'secret_type_display_name', 'secret', 'validity', 'resolution', 'resolved_by', 'resolved_by_login',
+    'resolved_at', 'resolution_comment', 'push_protection_bypassed', 'push_protection_bypassed_by',
+    'push_protection_bypassed_by_login', 'push_protection_bypassed_at'
+]
+
+# Organization-level alert endpoints add the repository of each alert
+REPOSITORY_FIELDS = [
+    'repository_id', 'repository_node_id', 'repository_name', 'repository_full_name', 'repository_private',
+    'repository_owner_login', 'repository_owner_id', 'repository_owner_node_id', 'repository_owner_avatar_url',
+    'repository_owner_gravatar_id', 'repository_owner_url', 'repository_owner_html_url',
+    'repository_owner_followers_url', 'repository_owner_following_url', 'repository_owner_gists_url',
+    'repository_owner_starred_url', 'repository_owner_subscriptions_url', 'repository_owner_organizations_url',
+    'repository_owner_repos_url', 'repository_owner_events_url', 'repository_owner_received_events_url',
+    'repository_owner_type', 'repository_owner_site_admin', 'repository_html_url', 'repository_description',
+    'repository_fork', 'repository_url', 'repository_forks_url', 'repository_keys_url',
+    'repository_collaborators_url', 'repository_teams_url', 'repository_hooks_url', 'repository_issue_events_url',
+    'repository_events_url', 'repository_assignees_url', 'repository_branches_url', 'repository_tags_url',
+    'repository_blobs_url', 'repository_git_tags_url', 'repository_git_refs_url', 'repository_trees_url',
+    'repository_statuses_url', 'repository_languages_url', 'repository_stargazers_url',
+    'repository_contributors_url', 'repository_subscribers_url', 'repository_subscription_url',
+    'repository_commits_url', 'repository_git_commits_url', 'repository_comments_url',
+    'repository_issue_comment_url', 'repository_contents_url', 'repository_compare_url', 'repository_merges_url',
+    'repository_archive_url', 'repository_downloads_url', 'repository_issues_url', 'repository_pulls_url',
+    'repository_milestones_url', 'repository_notifications_url', 'repository_labels_url',
+    'repository_releases_url', 'repository_deployments_url'
+]
+
+ALERT_SCHEMAS = {
+    'dependabot': DEPENDABOT_FIELDS,
+    'code-scanning': CODE_SCANNING_FIELDS,
+    'secret': SECRET_FIELDS
+}
+
+def get_csv_headers(alert_type, include_repository=True):
+    headers = list(ALERT_SCHEMAS[alert_type])
+    if include_repository:
+        headers.extend(REPOSITORY_FIELDS)
+    headers.append(EXTRA_FIELDS_COLUMN)
+    return headers
+
+def to_schema_row(alert, headers):
+    # Map one flattened alert onto the schema columns. headers must be a set for fast lookups.
+    row = {}
+    extra_fields = {}
+    for key, value in alert.items():
+        if key in headers:
+            row[key] = value
+        else:
+            extra_fields[key] = value
+    if extra_fields:
+        row[EXTRA_FIELDS_COLUMN] = json.dumps(extra_fields, default=str)
+    return row
@@ -0,0 +1,188 @@
+import json
+import os
+import sqlite3
+import threading
+
+from alert_schema import ALERT_SCHEMAS, EXTRA_FIELDS_COLUMN
+
+# Local store of GitHub security alerts.
+#
+# Raw alerts: alerts are kept as their raw JSON, keyed by the alert API url (unique across
+# repos and alert types). For every org and alert type the store also remembers the newest
+# updated_at it has seen (the high-water mark), so the next sync only needs to page
+# through alerts updated after it. See fetch-org-alerts.py --sync.
+#
+# Warehouse: flattened alerts are also kept in one table per entity of
+# pull_all_repo_security_alerts/ghas-security-alerts-erd.md, with a column per schema field
+# (see alert_schema.py) and indexes on repo, state, severity, created_at and updated_at, so
+# SLA and trend queries are indexed SQL lookups instead of CSV reparses. Rows are upserted by
+# alert url and never deleted, so history accumulates across runs; first_seen_at and
+# last_seen_at record when each alert was first and last fetched.
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS alerts (
+    url TEXT PRIMARY KEY,
+    org TEXT NOT NULL,
+    alert_type TEXT NOT NULL,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_org_type ON alerts (org, alert_type);
+CREATE TABLE IF NOT EXISTS sync_state (
+    org TEXT NOT NULL,
+    alert_type TEXT NOT NULL,
+    high_water_mark TEXT,
+    synced_at TEXT,
+    PRIMARY KEY (org, alert_type)
+);
+'''
+
+# Warehouse table of each alert type, and the column holding its severity
+WAREHOUSE_TABLES = {
+    'dependabot': ('dependabot_alerts', 'security_advisory_severity'),
+    'code-scanning': ('code_scanning_alerts', 'rule_security_severity_level'),
+    'secret': ('secret_scanning_alerts', 'validity'),
+    'advisory': ('security_advisories', 'severity'),
+}
+
+ADVISORY_FIELDS = [
+    'ghsa_id', 'cve_id', 'url', 'html_url', 'summary', 'description', 'severity', 'author', 'publisher',
+    'state', 'created_at', 'updated_at', 'published_at'
+]
+
+# Repository columns kept in the warehouse; the other repository_* fields are API url templates
+WAREHOUSE_REPOSITORY_FIELDS = ['repository_id', 'repository_full_name', 'repository_private']
+WAREHOUSE_EXTRA_COLUMNS = ['org', EXTRA_FIELDS_COLUMN, 'first_seen_at', 'last_seen_at']
+
+INTEGER_FIELDS = {
+    'number', 'repository_id', 'most_recent_instance_location_start_line', 'most_recent_instance_location_end_line',
+    'most_recent_instance_location_start_column', 'most_recent_instance_location_end_column'
+}
+REAL_FIELDS = {'security_advisory_cvss_score'}
+
+def get_warehouse_columns(alert_type):
+    fields = ADVISORY_FIELDS if alert_type == 'advisory' else ALERT_SCHEMAS[alert_type]
+    return fields + WAREHOUSE_REPOSITORY_FIELDS + WAREHOUSE_EXTRA_COLUMNS
+
+def get_warehouse_schema(alert_type):
+    table, severity_column = WAREHOUSE_TABLES[alert_type]
+    column_definitions = []
+    for column in get_warehouse_columns(alert_type):
+        column_type = 'INTEGER' if column in INTEGER_FIELDS else 'REAL' if column in REAL_FIELDS else 'TEXT'
+        column_definitions.append(f'{column} {column_type}' + (' PRIMARY KEY' if column == 'url' else ''))
+    statements = [f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(column_definitions)});"]
+    for column in ['repository_full_name', 'state', severity_column, 'created_at', 'updated_at']:
+        statements.append(f'CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column});')
+    return '\n'.join(statements)
+
+# SQLite has no list, dict or boolean type: lists and dicts are stored as JSON, booleans as 0/1
+def to_sql_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+class AlertStore:
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by all threads; the lock serializes access to it
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.executescript(SCHEMA)
+            for alert_type in WAREHOUSE_TABLES:
+                self.conn.executescript(get_warehouse_schema(alert_type))
+
+    def upsert_alerts(self, org, alert_type, alerts):
+        rows = [(alert['url'], org, alert_type, alert.get('updated_at'), json.dumps(alert)) for alert in alerts]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'INSERT INTO alerts (url, org, alert_type, updated_at, data) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(url) DO UPDATE SET updated_at = excluded.updated_at, data = excluded.data',
+                rows
+            )
+        return len(rows)
+
+    def get_alerts(self, org, alert_type, chunk_size=1000):
+        # Yields the stored alerts one at a time, oldest update first.
+        # Rows are read in chunks so the whole alert set is never loaded at once.
+        with self.lock:
+            cursor = self.conn.execute(
+                'SELECT data FROM alerts WHERE org = ? AND alert_type = ? ORDER BY updated_at',
+                (org, alert_type)
+            )
+        while True:
+            with self.lock:
+                rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for (data,) in rows:
+                yield json.loads(data)
+
+    def count_alerts(self, org, alert_type):
+        with self.lock:
+            return self.conn.execute(
+                'SELECT COUNT(*) FROM alerts WHERE org = ? AND alert_type = ?', (org, alert_type)
+            ).fetchone()[0]
+
+    def get_high_water_mark(self, org, alert_type):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT high_water_mark FROM sync_state WHERE org = ? AND alert_type = ?', (org, alert_type)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_high_water_mark(self, org, alert_type, high_water_mark, synced_at):
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO sync_state (org, alert_type, high_water_mark, synced_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(org, alert_type) DO UPDATE SET high_water_mark = excluded.high_water_mark, synced_at = excluded.synced_at',
+                (org, alert_type, high_water_mark, synced_at)
+            )
+
+    def upsert_rows(self, org, alert_type, rows, seen_at):
+        # Upserts flattened alerts (or advisories) into the warehouse table of alert_type.
+        # Keys that are not warehouse columns, except the repository_* url templates, go to extra_fields.
+        table = WAREHOUSE_TABLES[alert_type][0]
+        columns = get_warehouse_columns(alert_type)
+        known_columns = set(columns)
+        values = []
+        for row in rows:
+            record = dict.fromkeys(columns)
+            extra_fields = {}
+            for key, value in row.items():
+                if key in known_columns:
+                    record[key] = to_sql_value(value)
+                elif not key.startswith('repository_'):
+                    extra_fields[key] = value
+            if extra_fields:
+                record[EXTRA_FIELDS_COLUMN] = json.dumps(extra_fields, default=str)
+            record['org'] = org
+            record['first_seen_at'] = seen_at
+            record['last_seen_at'] = seen_at
+            values.append(tuple(record[column] for column in columns))
+
+        # first_seen_at keeps the value from the first run that saw the alert
+        updates = ', '.join(f'{column} = excluded.{column}' for column in columns if column not in ('url', 'first_seen_at'))
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f'ON CONFLICT(url) DO UPDATE SET {updates}',
+                values
+            )
+        return len(values)
+
+    def query(self, sql, params=()):
+        # Runs a read query against the store and returns the rows as dicts
+        with self.lock:
+            cursor = self.conn.execute(sql, params)
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,119 @@
+# Micro-benchmark for flattening dependabot alert payloads.
+#
+# Compares AlertFlattener against the two flatten implementations the scripts used before:
+# the recursive flatten_dict from fetch-org-alerts.py and the recursive dict comprehension
+# from ghas-fetch-repo-security-alerts.py. All three must produce identical output.
+#
+# Usage: python benchmark_flatten.py [number_of_alerts]
+
+import sys
+import time
+import random
+import collections.abc
+
+from alert_flattener import AlertFlattener, flatten_dict
+
+
+# Previous implementation in pull_all_org_security_alerts/fetch-org-alerts.py
+# (collections.MutableMapping changed to collections.abc.MutableMapping so it runs on Python 3.10+)
+def flatten_dict_org(d, parent_key='', sep='_'):
+    items = []
+    for k, v in d.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        if isinstance(v, collections.abc.MutableMapping):
+            items.extend(flatten_dict_org(v, new_key, sep=sep).items())
+        else:
+            items.append((new_key, v))
+    return dict(items)
+
+
+# Previous implementation in pull_all_repo_security_alerts/ghas-fetch-repo-security-alerts.py
+def flatten_dict_repo(dd, separator='_', prefix=''):
+    return {
+        f"{prefix}{separator}{k}" if prefix else k : v
+        for kk, vv in dd.items()
+        for k, v in flatten_dict_repo(vv, separator, kk).items()
+    } if isinstance(dd, dict) else { prefix : dd }
+
+
+def make_user(rng):
+    login = f"user{rng.randint(1, 500)}"
+    return {
+        'login': login, 'id': rng.randint(1, 10**7), 'node_id': 'MDQ6VXNlcjE=', 'avatar_url': f'https://avatars.githubusercontent.com/u/{login}',
+        'url': f'https://api.github.com/users/{login}', 'html_url': f'https://github.com/{login}', 'type': 'User', 'site_admin': False,
+    }
+
+
+# Builds a dependabot alert with the shape returned by GET /orgs/{org}/dependabot/alerts
+def make_dependabot_alert(rng, number):
+    repo = f"repo-{rng.randint(1, 2000)}"
+    severity = rng.choice(['low', 'medium', 'high', 'critical'])
+    package = {'ecosystem': rng.choice(['npm', 'pip', 'maven', 'nuget']), 'name': f'package-{rng.randint(1, 5000)}'}
+    dismissed = rng.random() < 0.2
+    return {
+        'number': number,
+        'state': 'dismissed' if dismissed else 'open',
+        'dependency': {'package': dict(package), 'manifest_path': 'package-lock.json', 'scope': 'runtime'},
+        'security_advisory': {
+            'ghsa_id': 'GHSA-8489-44mv-ggj8', 'cve_id': 'CVE-2021-44832', 'summary': 'Improper input validation',
+            'description': 'A long advisory description. ' * 10, 'severity': severity,
+            'identifiers': [{'value': 'GHSA-8489-44mv-ggj8', 'type': 'GHSA'}, {'value': 'CVE-2021-44832', 'type': 'CVE'}],
+            'references': [{'url': 'https://nvd.nist.gov/vuln/detail/CVE-2021-44832'}],
+            'published_at': '2021-12-28T20:09:31Z', 'updated_at': '2023-01-27T05:05:28Z', 'withdrawn_at': None,
+            'vulnerabilities': [{'package': dict(package), 'severity': severity, 'vulnerable_version_range': '< 2.17.1',
+                                 'first_patched_version': {'identifier': '2.17.1'}}],
+            'cvss': {'vector_string': 'CVSS:3.1/AV:N/AC:H/PR:H/UI:N/S:U/C:H/I:H/A:H', 'score': 6.6},
+            'cwes': [{'cwe_id': 'CWE-20', 'name': 'Improper Input Validation'}],
+        },
+        'security_vulnerability': {
+            'package': dict(package), 'severity': severity, 'vulnerable_version_range': '< 2.17.1',
+            'first_patched_version': {'identifier': '2.17.1'},
+        },
+        'url': f'https://api.github.com/repos/org/{repo}/dependabot/alerts/{number}',
+        'html_url': f'https://github.com/org/{repo}/security/dependabot/{number}',
+        'created_at': '2023-01-27T05:05:28Z', 'updated_at': '2023-06-01T12:00:00Z',
+        'dismissed_at': '2023-06-01T12:00:00Z' if dismissed else None,
+        'dismissed_by': make_user(rng) if dismissed else None,
+        'dismissed_reason': 'tolerable_risk' if dismissed else None,
+        'dismissed_comment': None, 'fixed_at': None, 'auto_dismissed_at': None,
+        'repository': {
+            'id': rng.randint(1, 10**7), 'node_id': 'R_kgDOABCDEF', 'name': repo, 'full_name': f'org/{repo}',
+            'owner': make_user(rng), 'private': rng.random() < 0.5, 'html_url': f'https://github.com/org/{repo}',
+            'description': None, 'fork': False, 'url': f'https://api.github.com/repos/org/{repo}',
+        },
+    }
+
+
+def time_it(name, flatten, alerts):
+    start = time.perf_counter()
+    for alert in alerts:
+        flatten(alert)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<45} {elapsed:8.3f}s  {len(alerts) / elapsed:>12,.0f} alerts/s")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(42)
+    print(f"Generating {count:,} dependabot alerts...")
+    alerts = [make_dependabot_alert(rng, number) for number in range(1, count + 1)]
+
+    flattener = AlertFlattener()
+    for alert in alerts[:1000]:
+        expected = flatten_dict_org(alert)
+        if flatten_dict_repo(alert) != expected or flattener.flatten(alert) != expected or flatten_dict(alert) != expected:
+            sys.exit(f"Flattened output differs for alert {alert['number']}")
+        if list(flattener.flatten(alert)) != list(expected):
+            sys.exit(f"Flattened key order differs for alert {alert['number']}")
+
+    print(f"Flattening {count:,} alerts:")
+    baseline = time_it('fetch-org-alerts.py flatten_dict (recursive)', flatten_dict_org, alerts)
+    time_it('ghas-fetch-repo flatten_dict (comprehension)', flatten_dict_repo, alerts)
+    time_it('alert_flattener.flatten_dict (iterative)', flatten_dict, alerts)
+    compiled = time_it('AlertFlattener (compiled plans)', AlertFlattener().flatten, alerts)
+    print(f"AlertFlattener speedup over fetch-org-alerts.py flatten_dict: {baseline / compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import requests
+from requests.adapters import HTTPAdapter
+from requests.models import PreparedRequest
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+from rate_limiter import RateLimiter
+
+# Shared HTTP client for the GitHub REST API.
+#
+# A single GitHubClient keeps a pool of keep-alive connections to api.github.com so
+# that thousands of API calls in a scan reuse the same TCP/TLS connections instead of
+# opening a new one per request. It is a requests.Session, so it can be used anywhere
+# the scripts previously called requests.get / requests.patch.
+#
+# Every request goes through a RateLimiter (see rate_limiter.py) which paces calls
+# against the X-RateLimit-* headers and retries requests that hit a primary or
+# secondary rate limit, instead of handing the 403/429 back to the caller.
+#
+# With a ResponseCache (see response_cache.py), GET requests are sent as conditional
+# requests and a 304 Not Modified is answered from the on-disk cache.
+#
+# Usage:
+#   client = GitHubClient(headers={'Authorization': f'token {token}'}, pool_size=8)
+#   response = client.get('https://api.github.com/user')
+#   for page in client.get_pages('https://api.github.com/orgs/my-org/repos', {'per_page': 100}):
+#       ...
+#   print(client.connection_stats())
+
+# Server errors that are safe to retry. 403/429 are left to the RateLimiter since
+# GitHub uses them for both permission errors and rate limiting.
+RETRY_STATUS_CODES = [500, 502, 503, 504]
+
+class GitHubClient(requests.Session):
+
+    def __init__(self, headers=None, pool_size=10, retries=3, backoff_factor=0.5, timeout=30,
+                 rate_limiter=None, rate_limit_retries=5, cache=None):
+        super().__init__()
+        self.timeout = timeout
+        # Pass the same RateLimiter to several clients to make them share one budget
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.rate_limit_retries = rate_limit_retries
+        self.cache = cache
+        if headers:
+            self.headers.update(headers)
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET', 'HEAD', 'PATCH', 'POST', 'PUT']),
+            raise_on_status=False  # Return the last response so callers can inspect the status code
+        )
+        # pool_maxsize should be at least the number of threads sharing this client,
+        # otherwise extra connections are discarded instead of being kept alive.
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        # requests has no session-wide timeout, so apply the default here
+        kwargs.setdefault('timeout', self.timeout)
+
+        cache_key = None
+        cache_entry = None
+        if self.cache is not None and method.upper() == 'GET' and self.cache.is_cacheable(url):
+            request_headers = CaseInsensitiveDict(self.headers)
+            request_headers.update(kwargs.get('headers') or {})
+            prepared = PreparedRequest()
+            prepared.prepare_url(url, kwargs.get('params'))
+            cache_key = self.cache.make_key(prepared.url, request_headers)
+            cache_entry = self.cache.get(cache_key)
+            if cache_entry is not None:
+                request_headers.update(self.cache.conditional_headers(cache_entry))
+                kwargs['headers'] = request_headers
+
+        for attempt in range(self.rate_limit_retries + 1):
+            self.rate_limiter.acquire(url)
+            response = super().request(method, url, **kwargs)
+            wait = self.rate_limiter.update(response)
+            if wait is None or attempt == self.rate_limit_retries:
+                break
+            # The limiter now blocks every thread until the limit clears, so the
+            # next acquire() waits before this request is retried.
+            print(f"Rate limited on {url} (status {response.status_code}), retrying after {wait:.0f} seconds")
+
+        if cache_key is not None:
+            if response.status_code == 304 and cache_entry is not None:
+                self.cache.record(hit=True)
+                return self.build_cached_response(response, cache_entry)
+            self.cache.record(hit=False)
+            if response.status_code == 200:
+                self.cache.store(cache_key, response)
+        return response
+
+    def build_cached_response(self, not_modified_response, cache_entry):
+        # Turn a 304 Not Modified into the 200 response it stands for, so callers never see the 304
+        cached = requests.Response()
+        cached.status_code = 200
+        cached.reason = 'OK'
+        cached.url = not_modified_response.url
+        cached.request = not_modified_response.request
+        cached.headers = CaseInsensitiveDict(not_modified_response.headers)
+        cached.headers.update(cache_entry['headers'])
+        cached.encoding = 'utf-8'
+        cached._content = cache_entry['body'].encode('utf-8')
+        cached.from_cache = True
+        return cached
+
+    def connection_stats(self):
+        # Count the connections opened versus reused across all connection pools.
+        # urllib3 tracks num_connections (new sockets) and num_requests per host pool.
+        opened = 0
+        total_requests = 0
+        for adapter in set(self.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                opened += pool.num_connections
+                total_requests += pool.num_requests
+        return {
+            'requests': total_requests,
+            'connections_opened': opened,
+            'connections_reused': max(total_requests - opened, 0)
+        }
+
+    def get_pages(self, url, params=None):
+        # Yield the response for each page of a list endpoint, following the Link header.
+        # Stops after the first non-200 response so the caller can inspect its status code.
+        while url:
+            response = self.get(url, params=params)
+            yield response
+            if response.status_code != 200:
+                return
+            url = response.links.get('next', {}).get('url')
+            params = None  # The next link already carries the query string
+
+    def quota(self, resource='core'):
+        # Current rate limit quota, e.g. {'limit': 5000, 'remaining': 4210, 'reset': 1715800000, 'used': 790}
+        return self.rate_limiter.quota(resource)
+
+    def print_connection_stats(self):
+        stats = self.connection_stats()
+        print(f"HTTP connections: {stats['connections_opened']} opened, {stats['connections_reused']} reused ({stats['requests']} requests)")
+        if self.cache is not None:
+            self.cache.print_summary()
@@ -0,0 +1,131 @@
+import json
+from datetime import datetime
+
+# Optional Parquet output with typed columns.
+#
+# CSV output stringifies everything: timestamps have to be re-parsed, booleans come back as
+# 'True'/'False' and list fields like rule_tags are Python reprs. The Parquet files written
+# here keep real types (UTC timestamps, booleans, integers, dictionary-encoded categories and
+# list columns), so pandas can load only the columns it needs without any re-parsing.
+#
+# pyarrow is an optional dependency. Without it, PARQUET_AVAILABLE is False and callers
+# should fall back to CSV:
+#   pip install pyarrow
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PARQUET_AVAILABLE = False
+
+# Column types by name. Columns not listed are strings; dicts and lists in string
+# columns are stored as JSON.
+TIMESTAMP_COLUMNS = {
+    'created_at', 'updated_at', 'fixed_at', 'dismissed_at', 'auto_dismissed_at', 'resolved_at',
+    'push_protection_bypassed_at', 'security_advisory_published_at', 'security_advisory_updated_at',
+    'security_advisory_withdrawn_at', 'last_commit_date', 'first_commit_date'
+}
+INTEGER_COLUMNS = {
+    'number', 'most_recent_instance_location_start_line', 'most_recent_instance_location_end_line',
+    'most_recent_instance_location_start_column', 'most_recent_instance_location_end_column',
+    'repository_id', 'repository_owner_id',
+    'code_scanning_critical_alert_count', 'code_scanning_high_alert_count', 'code_scanning_medium_alert_count',
+    'code_scanning_low_alert_count', 'code_scanning_warning_alert_count', 'code_scanning_note_alert_count',
+    'code_scanning_error_alert_count', 'dependabot_open_alerts_count', 'num_critical_dep_alerts',
+    'num_high_dep_alerts', 'num_medium_dep_alerts', 'num_low_dep_alerts'
+}
+FLOAT_COLUMNS = {'security_advisory_cvss_score'}
+BOOLEAN_COLUMNS = {
+    'push_protection_bypassed', 'repository_private', 'repository_fork', 'repository_owner_site_admin',
+    'is_fork', 'is_private', 'is_archived', 'security_and_analysis_enabled', 'secret_scanning_enabled',
+    'secret_scanning_push_protection_enabled'
+}
+CATEGORY_COLUMNS = {
+    'state', 'rule_severity', 'rule_security_severity_level', 'security_advisory_severity',
+    'security_vulnerability_severity', 'validity', 'resolution', 'dismissed_reason', 'tool_name',
+    'secret_type', 'dependency_scope', 'dependency_package_ecosystem', 'most_recent_instance_state',
+    'owner_type', 'owner_name', 'dependabot_enabled'
+}
+# List columns, with the function that turns one list item into a string
+LIST_COLUMNS = {
+    'rule_tags': str,
+    'most_recent_instance_classifications': str,
+    'security_advisory_references': lambda item: item.get('url') if isinstance(item, dict) else str(item),
+    'security_advisory_identifiers': lambda item: f"{item.get('type')}:{item.get('value')}" if isinstance(item, dict) else str(item),
+    'security_advisory_cwes': lambda item: item.get('cwe_id') if isinstance(item, dict) else str(item)
+}
+
+def parse_timestamp(value):
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value
+    # fromisoformat only understands 'Z' from Python 3.11
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+def parse_boolean(value):
+    if value in (None, ''):
+        return None
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() == 'true'
+
+def parse_number(value, number_type):
+    if value in (None, ''):
+        return None
+    return number_type(value)
+
+def to_string(value):
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+def get_column_type(column):
+    if column in TIMESTAMP_COLUMNS:
+        return pa.timestamp('s', tz='UTC'), parse_timestamp
+    if column in INTEGER_COLUMNS:
+        return pa.int64(), lambda value: parse_number(value, int)
+    if column in FLOAT_COLUMNS:
+        return pa.float64(), lambda value: parse_number(value, float)
+    if column in BOOLEAN_COLUMNS:
+        return pa.bool_(), parse_boolean
+    if column in CATEGORY_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string()), to_string
+    if column in LIST_COLUMNS:
+        item_to_string = LIST_COLUMNS[column]
+        return pa.list_(pa.string()), lambda value: [item_to_string(item) for item in value] if isinstance(value, list) else None
+    return pa.string(), to_string
+
+def write_parquet(rows, columns, filename, batch_size=10000):
+    # Write an iterable of row dicts to a Parquet file with typed columns, batch_size rows at a
+    # time so memory stays flat. Returns the number of rows written.
+    if not PARQUET_AVAILABLE:
+        raise ImportError("Parquet output needs pyarrow. Install it with: pip install pyarrow")
+
+    column_types = {column: get_column_type(column) for column in columns}
+    schema = pa.schema([(column, column_types[column][0]) for column in columns])
+
+    count = 0
+    batch = []
+    with pq.ParquetWriter(filename, schema) as writer:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                count += write_batch(writer, batch, columns, column_types, schema)
+                batch = []
+        if batch:
+            count += write_batch(writer, batch, columns, column_types, schema)
+    return count
+
+def write_batch(writer, batch, columns, column_types, schema):
+    data = {}
+    for column in columns:
+        convert = column_types[column][1]
+        data[column] = [convert(row.get(column)) for row in batch]
+    writer.write_table(pa.Table.from_pydict(data, schema=schema))
+    return len(batch)
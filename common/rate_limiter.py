@@ -0,0 +1,128 @@
+import threading
+import time
+
+# Rate-limit-aware request scheduler for the GitHub REST API.
+#
+# GitHub reports the primary rate limit on every response with the X-RateLimit-Limit,
+# X-RateLimit-Remaining, X-RateLimit-Reset and X-RateLimit-Resource headers. Secondary
+# rate limits are signalled by a 403 or 429 with a Retry-After header, or a message
+# mentioning "secondary rate limit".
+# Docs: https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api
+#
+# A single RateLimiter is shared by every thread using a GitHubClient:
+#   * While plenty of quota is left, requests go out as fast as the callers send them.
+#   * Once the remaining quota drops below the reserve, requests are spaced evenly so
+#     that the rest of the budget lasts until the reset time (a token bucket refilled
+#     at remaining / seconds_until_reset).
+#   * When the quota is exhausted or a secondary limit triggers, all threads pause
+#     until the reset time or for Retry-After seconds, then the request is retried.
+
+# GitHub asks clients to wait at least one minute after a secondary rate limit
+# when no Retry-After header is sent.
+SECONDARY_LIMIT_DEFAULT_WAIT = 60
+
+def get_resource_for_url(url):
+    # Best guess of which rate limit bucket a request will be counted against,
+    # before we have seen the X-RateLimit-Resource header of its response.
+    if '/graphql' in url:
+        return 'graphql'
+    if '/search/' in url:
+        return 'search'
+    return 'core'
+
+class RateLimiter:
+
+    def __init__(self, reserve=0.1, max_backoff=900, verbose=True):
+        # reserve: fraction of the limit below which requests start to be paced
+        self.reserve = reserve
+        self.max_backoff = max_backoff
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.quotas = {}  # resource -> {'limit', 'remaining', 'reset', 'used'}
+        self.next_slot = {}  # resource -> earliest time the next paced request may be sent
+        self.blocked_until = 0
+        self.secondary_limit_hits = 0
+        self.waited_seconds = 0.0
+
+    def acquire(self, url):
+        # Block the calling thread until a request to url may be sent
+        resource = get_resource_for_url(url)
+        with self.lock:
+            now = time.time()
+            wait = max(self.blocked_until - now, 0)
+            quota = self.quotas.get(resource)
+            if quota is not None and quota['remaining'] is not None:
+                seconds_to_reset = max(quota['reset'] - now, 0)
+                if quota['remaining'] <= 0 and seconds_to_reset > 0:
+                    # Budget spent: wait for the window to reset
+                    wait = max(wait, seconds_to_reset + 1)
+                elif quota['remaining'] < quota['limit'] * self.reserve and seconds_to_reset > 0:
+                    # Running low: spread the remaining requests over the rest of the window
+                    interval = seconds_to_reset / max(quota['remaining'], 1)
+                    slot = max(self.next_slot.get(resource, now), now + wait)
+                    self.next_slot[resource] = slot + interval
+                    wait = slot - now
+                # Count this request now so concurrent threads see the reduced budget
+                quota['remaining'] = max(quota['remaining'] - 1, 0)
+            self.waited_seconds += wait
+
+        if wait > 0:
+            if self.verbose and wait >= 5:
+                print(f"Rate limit: waiting {wait:.0f} seconds before calling {url}")
+            time.sleep(wait)
+
+    def update(self, response):
+        # Record the quota reported by a response and return the number of seconds to
+        # wait before retrying it, or None if the response was not rate limited.
+        headers = response.headers
+        resource = headers.get('X-RateLimit-Resource') or get_resource_for_url(response.url)
+        now = time.time()
+
+        with self.lock:
+            if 'X-RateLimit-Remaining' in headers:
+                self.quotas[resource] = {
+                    'limit': int(headers.get('X-RateLimit-Limit', 0)),
+                    'remaining': int(headers['X-RateLimit-Remaining']),
+                    'reset': int(headers.get('X-RateLimit-Reset', now)),
+                    'used': int(headers.get('X-RateLimit-Used', 0))
+                }
+
+            if response.status_code not in (403, 429):
+                self.secondary_limit_hits = 0
+                return None
+
+            retry_after = headers.get('Retry-After')
+            if retry_after is not None:
+                # Secondary rate limit with an explicit delay
+                try:
+                    wait = int(retry_after)
+                except ValueError:
+                    wait = SECONDARY_LIMIT_DEFAULT_WAIT
+            elif headers.get('X-RateLimit-Remaining') == '0':
+                # Primary rate limit exhausted
+                wait = max(int(headers.get('X-RateLimit-Reset', now)) - now, 0) + 1
+            elif 'rate limit' in response.text.lower():
+                # Secondary rate limit without Retry-After: back off exponentially
+                wait = SECONDARY_LIMIT_DEFAULT_WAIT * (2 ** self.secondary_limit_hits)
+            else:
+                # A real permission error, not a rate limit
+                return None
+
+            self.secondary_limit_hits += 1
+            wait = min(wait, self.max_backoff)
+            self.blocked_until = max(self.blocked_until, now + wait)
+            return wait
+
+    def quota(self, resource='core'):
+        # Current view of the quota for a resource, or None before the first response
+        with self.lock:
+            quota = self.quotas.get(resource)
+            return dict(quota) if quota is not None else None
+
+    def print_quota(self):
+        with self.lock:
+            for resource, quota in sorted(self.quotas.items()):
+                reset = time.strftime('%H:%M:%S', time.localtime(quota['reset']))
+                print(f"Rate limit ({resource}): {quota['remaining']}/{quota['limit']} remaining, resets at {reset}")
+            if self.waited_seconds:
+                print(f"Rate limit: waited {self.waited_seconds:.0f} seconds in total")
@@ -0,0 +1,65 @@
+import pandas as pd
+
+from parquet_export import PARQUET_AVAILABLE, pq
+
+# Typed, column-selective loading of the CSV/Parquet reports written by the scripts.
+#
+# Each report type declares the columns its readers actually use and their dtypes, so
+# pd.read_csv skips everything else (e.g. multi-kilobyte security_advisory_description
+# text) and builds categoricals and timestamps while parsing instead of in a second pass.
+# 'datetime' columns are parsed as UTC timestamps.
+REPORT_SCHEMAS = {
+    # Reports of pull_all_org_security_alerts/fetch-org-alerts.py, read by generate_report
+    'secrets': {
+        'state': 'category', 'created_at': 'datetime', 'html_url': 'string',
+        'repository_full_name': 'category', 'validity': 'category',
+    },
+    'dependencies': {
+        'state': 'category', 'created_at': 'datetime', 'html_url': 'string',
+        'repository_full_name': 'category', 'security_advisory_severity': 'category',
+    },
+    'code_scanning': {
+        'state': 'category', 'created_at': 'datetime', 'html_url': 'string',
+        'repository_full_name': 'category', 'rule_security_severity_level': 'category', 'rule_severity': 'category',
+    },
+    # Report of ghas-org-scan/ghas-scan.py, read by print_aggregated_metrics_from_csv
+    'scan': {
+        'is_private': 'boolean', 'is_fork': 'boolean', 'codeowners': 'string',
+        'secret_scanning_enabled': 'boolean', 'secret_scanning_push_protection_enabled': 'boolean',
+        'code_scanning_critical_alert_count': 'Int64', 'code_scanning_high_alert_count': 'Int64',
+        'num_critical_dep_alerts': 'Int64',
+    },
+}
+
+def get_report_columns(report_type):
+    return list(REPORT_SCHEMAS[report_type])
+
+# Returns the columns present in the file, without reading its rows
+def read_file_columns(filename):
+    if filename.endswith('.parquet'):
+        return pq.read_schema(filename).names
+    return list(pd.read_csv(filename, nrows=0).columns)
+
+# Loads the declared columns of a report type from a .csv or .parquet file.
+# Declared columns missing from the file are skipped; callers check for the ones they require.
+def load_report(filename, report_type):
+    schema = REPORT_SCHEMAS[report_type]
+    if filename.endswith('.parquet') and not PARQUET_AVAILABLE:
+        raise ImportError(f"pyarrow is required to read {filename} (pip install pyarrow)")
+
+    file_columns = set(read_file_columns(filename))
+    columns = [column for column in schema if column in file_columns]
+    date_columns = [column for column in columns if schema[column] == 'datetime']
+
+    if filename.endswith('.parquet'):
+        # Parquet files written by parquet_export are already typed
+        df = pd.read_parquet(filename, columns=columns)
+    else:
+        dtypes = {column: schema[column] for column in columns if schema[column] != 'datetime'}
+        df = pd.read_csv(filename, usecols=columns, dtype=dtypes, parse_dates=date_columns, on_bad_lines='skip')
+
+    # Timestamps without an offset, or unparseable values, are normalized to UTC here
+    for column in date_columns:
+        if not isinstance(df[column].dtype, pd.DatetimeTZDtype):
+            df[column] = pd.to_datetime(df[column], utc=True, errors='coerce')
+    return df
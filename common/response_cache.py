@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# On-disk cache of GitHub API responses for conditional requests.
+#
+# Each cached GET stores the response body along with its ETag and Last-Modified
+# values. The next time the same URL is requested with the same token, the client
+# sends If-None-Match / If-Modified-Since and GitHub answers 304 Not Modified when
+# nothing changed. A 304 does not count against the rate limit, so repeated nightly
+# scans of mostly idle repos cost far fewer requests.
+# Docs: https://docs.github.com/en/rest/using-the-rest-api/best-practices-for-using-the-rest-api#use-conditional-requests-if-appropriate
+#
+# Entries are stored one JSON file per URL. When the cache grows beyond max_size_mb,
+# the least recently used entries are evicted.
+
+# Response headers that are needed to rebuild a cached response (Link drives pagination)
+CACHED_HEADERS = ['Content-Type', 'ETag', 'Last-Modified', 'Link']
+
+# Entries hold the raw API payloads in plain text. Secret scanning alerts carry the plaintext
+# secret, so those URLs are never cached and always fetched from the API.
+UNCACHED_URL_PARTS = ['/secret-scanning/']
+
+class ResponseCache:
+
+    def __init__(self, directory='.ghas_cache', max_size_mb=500):
+        self.directory = directory
+        self.max_size = max_size_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+    def is_cacheable(self, url):
+        return not any(part in url for part in UNCACHED_URL_PARTS)
+
+    def make_key(self, url, headers):
+        # Key by URL plus the token identity, so two tokens with different access never share entries.
+        # The token itself is hashed and never written to disk.
+        token_id = hashlib.sha256(headers.get('Authorization', '').encode('utf-8')).hexdigest()[:16]
+        accept = headers.get('Accept', '')
+        return hashlib.sha256(f"{token_id} {accept} {url}".encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self.path_for(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Touch the file so eviction treats it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, key, response):
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        entry = {
+            'url': response.url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers},
+            'body': response.text,
+            'stored_at': time.time()
+        }
+        data = json.dumps(entry)
+
+        path = self.path_for(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self.lock:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.size += os.path.getsize(path) - old_size
+            if self.size > self.max_size:
+                self.evict()
+
+    def evict(self):
+        # Remove least recently used entries until the cache is back under 90% of its limit.
+        # Called with self.lock held.
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith('.json')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        target = self.max_size * 0.9
+        for entry in entries:
+            if self.size <= target:
+                break
+            try:
+                entry_size = entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self.size -= entry_size
+            self.evictions += 1
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def print_summary(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0
+        print(f"HTTP cache: {self.hits} hits (304 Not Modified), {self.misses} misses, {hit_rate:.1f}% hit rate, "
+              f"{self.evictions} evicted, {self.size / (1024 * 1024):.1f} MB on disk")
@@ -0,0 +1,210 @@
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from ghas_scan_helpers import create_session, get_pages, load_checkpoint, append_checkpoint
+
+# Bulk enablement of repository security features.
+#
+# Selects the repos where secret scanning, push protection or Dependabot alerts are off, either
+# from the CSV written by ghas-scan.py or from a live listing of the owners' repos, then turns the
+# features on concurrently and re-reads each repo to verify the change. Every finished repo is
+# appended to a checkpoint journal, so an interrupted run continues with --resume.
+
+parser = argparse.ArgumentParser(description='Enable secret scanning, push protection and Dependabot alerts on every repository where they are off.')
+parser.add_argument('--from-csv', help='The CSV written by ghas-scan.py (github_data.csv). Repos are selected from its feature columns.')
+parser.add_argument('--owner', action='append', default=[], help='Select repos from a live listing of this owner instead of a CSV. Can be repeated.')
+parser.add_argument('--owner-type', choices=['org', 'user'], default='org', help='Whether the --owner names are orgs or users.')
+parser.add_argument('--features', default='secret_scanning,secret_scanning_push_protection,dependabot_alerts',
+                    help='Comma-separated features to enable: advanced_security, secret_scanning, secret_scanning_push_protection, dependabot_alerts.')
+parser.add_argument('--max-workers', type=int, default=8, help='Number of repos updated at the same time.')
+parser.add_argument('--dry-run', action='store_true', help='Only print the repos and features that would be enabled.')
+parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation before enabling.')
+parser.add_argument('--resume', action='store_true', help='Continue an interrupted run from its checkpoint journal instead of starting over.')
+parser.add_argument('--results', default='repo_security_enablement.csv', help='Where to write the result of each repo.')
+args = parser.parse_args()
+
+# Features set through the security_and_analysis block of Update a repository
+# https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#update-a-repository
+SECURITY_AND_ANALYSIS_FEATURES = ['advanced_security', 'secret_scanning', 'secret_scanning_push_protection']
+# Dependabot alerts have their own endpoint
+# https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#enable-vulnerability-alerts
+FEATURES = SECURITY_AND_ANALYSIS_FEATURES + ['dependabot_alerts']
+
+# Column of the ghas-scan.py CSV with the status of each feature. The scan's dependabot_enabled
+# means "has Dependabot alerts", so only True proves the feature is on. Features without a
+# column (advanced_security) are always candidates. Candidates are unverified until the live
+# status is read, which --dry-run and the update itself both do.
+SCAN_COLUMNS = {
+    'secret_scanning': 'secret_scanning_enabled',
+    'secret_scanning_push_protection': 'secret_scanning_push_protection_enabled',
+    'dependabot_alerts': 'dependabot_enabled',
+}
+
+RESULTS_FIELDS = ['full_name', 'missing', 'enabled', 'failed', 'error']
+
+def read_scan_csv(filename):
+    # Returns [(full_name, {feature: enabled})] for the non-archived repos of a scan CSV
+    repos = []
+    with open(filename, newline='') as csvfile:
+        for row in csv.DictReader(csvfile):
+            if row.get('is_archived') == 'True':
+                continue  # Archived repos are read-only
+            status = {feature: feature in SCAN_COLUMNS and row.get(SCAN_COLUMNS[feature]) == 'True' for feature in FEATURES}
+            repos.append((f"{row['owner_name']}/{row['repo_name']}", status))
+    return repos
+
+def get_security_and_analysis_status(repo):
+    security_and_analysis = repo.get('security_and_analysis') or {}
+    return {feature: (security_and_analysis.get(feature) or {}).get('status') == 'enabled' for feature in SECURITY_AND_ANALYSIS_FEATURES}
+
+def list_owner_repos(owner, owner_type, session):
+    # Returns [(full_name, {feature: enabled})] for the non-archived repos of an owner. The listing
+    # includes security_and_analysis for admins; Dependabot alerts are checked per repo later.
+    url = f'https://api.github.com/{"orgs" if owner_type == "org" else "users"}/{owner}/repos'
+    repos = []
+    for response in get_pages(session, url, {'per_page': 100}):
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch repositories for {owner}. Status code: {response.status_code}, Response: {response.text}")
+        for repo in response.json():
+            if not repo.get('archived'):
+                repos.append((repo['full_name'], dict(get_security_and_analysis_status(repo), dependabot_alerts=False)))
+    print(f"Number of repos found for {owner}: {len(repos)}")
+    return repos
+
+def get_feature_status(full_name, session):
+    # Reads the live status of every feature of a repo, or returns an error message
+    response = session.get(f'https://api.github.com/repos/{full_name}')
+    if response.status_code != 200:
+        return None, f"Failed to read {full_name}: {response.status_code} {response.text}"
+    status = get_security_and_analysis_status(response.json())
+    # 204 when Dependabot alerts are enabled, 404 when they are not
+    response = session.get(f'https://api.github.com/repos/{full_name}/vulnerability-alerts')
+    status['dependabot_alerts'] = response.status_code == 204
+    return status, None
+
+def enable_features(full_name, features, session):
+    # Turns the features on and returns the error messages, if any
+    errors = []
+    security_and_analysis = {feature: {'status': 'enabled'} for feature in features if feature in SECURITY_AND_ANALYSIS_FEATURES}
+    if security_and_analysis:
+        response = session.patch(f'https://api.github.com/repos/{full_name}', json={'security_and_analysis': security_and_analysis})
+        if response.status_code != 200:
+            errors.append(f"security_and_analysis: {response.status_code} {response.text}")
+    if 'dependabot_alerts' in features:
+        response = session.put(f'https://api.github.com/repos/{full_name}/vulnerability-alerts')
+        if response.status_code != 204:
+            errors.append(f"dependabot_alerts: {response.status_code} {response.text}")
+    return errors
+
+def get_missing_features(full_name, features, session):
+    # The features that are really off, from the live status, or an error message
+    status, error = get_feature_status(full_name, session)
+    if error:
+        return None, error
+    return [feature for feature in features if not status[feature]], None
+
+def enable_repo(full_name, missing, session):
+    # Enables the missing features of one repo, then re-reads the repo to verify them.
+    # Features the CSV or listing reported as off are checked live first, so repos that were
+    # fixed since the scan (or only lacked Dependabot alerts) are not patched needlessly.
+    to_enable, error = get_missing_features(full_name, missing, session)
+    if error:
+        return {'full_name': full_name, 'missing': missing, 'enabled': [], 'failed': missing, 'error': error}
+    errors = enable_features(full_name, to_enable, session) if to_enable else []
+
+    verified, error = get_feature_status(full_name, session) if to_enable else ({}, None)
+    if error:
+        errors.append(error)
+        verified = {}
+    return {
+        'full_name': full_name,
+        'missing': to_enable,
+        'enabled': [feature for feature in to_enable if verified.get(feature)],
+        'failed': [feature for feature in to_enable if not verified.get(feature)],
+        'error': '; '.join(errors),
+    }
+
+features = [feature.strip() for feature in args.features.split(',') if feature.strip()]
+unknown_features = [feature for feature in features if feature not in FEATURES]
+if unknown_features:
+    parser.error(f"Unknown features: {', '.join(unknown_features)}. Choices are: {', '.join(FEATURES)}")
+if bool(args.from_csv) == bool(args.owner):
+    parser.error("Use either --from-csv or --owner")
+
+access_token = os.environ.get('GITHUB_ACCESS_TOKEN')
+if not access_token:
+    raise Exception("Access token is missing or empty. Please set the GITHUB_ACCESS_TOKEN environment variable.")
+headers = {
+    'Authorization': f'token {access_token}',
+    'Accept': 'application/vnd.github.v3+json',
+}
+# The shared client paces every worker against the rate limit and retries rate-limited calls
+session = create_session(headers, pool_size=args.max_workers)
+
+if args.from_csv:
+    inventory = read_scan_csv(args.from_csv)
+else:
+    inventory = [repo for owner in args.owner for repo in list_owner_repos(owner, args.owner_type, session)]
+
+candidates = [(full_name, [feature for feature in features if not status[feature]]) for full_name, status in inventory]
+candidates = [(full_name, missing) for full_name, missing in candidates if missing]
+
+checkpoint_filename = f'{args.results}.checkpoint.jsonl'
+completed = load_checkpoint(checkpoint_filename) if args.resume else {}
+if completed:
+    print(f"Resuming from {checkpoint_filename}: {len(completed)} repos already done.")
+pending = [(full_name, missing) for full_name, missing in candidates if full_name not in completed]
+
+if args.dry_run:
+    # The CSV or listing only marks candidates, so read the live status of each before reporting
+    with ThreadPoolExecutor(max_workers=args.max_workers) as executor:
+        live = list(executor.map(lambda candidate: get_missing_features(candidate[0], candidate[1], session), pending))
+    missing_repos = [(full_name, missing) for (full_name, _), (missing, error) in zip(pending, live) if missing]
+    unreadable = [(full_name, error) for (full_name, _), (_, error) in zip(pending, live) if error]
+    print(f"{len(missing_repos)} of {len(inventory)} repos are missing at least one of: {', '.join(features)}")
+    for full_name, missing in missing_repos:
+        print(f"  {full_name}: {', '.join(missing)}")
+    for full_name, error in unreadable:
+        print(f"  {full_name}: ERROR {error}")
+    session.rate_limiter.print_quota()
+    sys.exit(0)
+
+print(f"{len(candidates)} of {len(inventory)} repos may be missing at least one of: {', '.join(features)} (unverified; each repo's live status is read before enabling)")
+for full_name, missing in pending[:20]:
+    print(f"  {full_name}: {', '.join(missing)}")
+if len(pending) > 20:
+    print(f"  ... and {len(pending) - 20} more")
+if not candidates:
+    sys.exit(0)
+if pending and not args.yes:
+    confirmation = input(f"Enable these features on {len(pending)} repos? Please confirm (y/n): ")
+    if confirmation.lower() != 'y':
+        print("Operation cancelled.")
+        sys.exit(0)
+
+# Repos are updated concurrently; results are journaled in the order of the inventory
+with open(checkpoint_filename, 'a' if args.resume else 'w') as checkpoint_file, ThreadPoolExecutor(max_workers=args.max_workers) as executor:
+    results = executor.map(lambda candidate: enable_repo(candidate[0], candidate[1], session), pending)
+    for i, result in enumerate(results, 1):
+        append_checkpoint(checkpoint_file, result['full_name'], result)
+        completed[result['full_name']] = result
+        if result['failed']:
+            print(f"{result['full_name']}: failed to enable {', '.join(result['failed'])} {result['error']}")
+        if i % 50 == 0:
+            print(f"Processed {i} of {len(pending)} repos")
+
+with open(args.results, 'w', newline='') as csvfile:
+    writer = csv.DictWriter(csvfile, fieldnames=RESULTS_FIELDS)
+    writer.writeheader()
+    for full_name, _ in candidates:
+        result = completed[full_name]
+        writer.writerow({field: ','.join(result[field]) if isinstance(result[field], list) else result[field] for field in RESULTS_FIELDS})
+
+# The journal is only needed to resume an interrupted run
+os.remove(checkpoint_filename)
+
+failed = [result for result in completed.values() if result['failed']]
+print(f"Enabled and verified features on {len(candidates) - len(failed)} of {len(candidates)} repos; {len(failed)} had failures. Results have been written to {args.results}")
+session.rate_limiter.print_quota()
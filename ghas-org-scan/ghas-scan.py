@@ -1,7 +1,13 @@
+import argparse
 import csv
 import os
 import time
-from ghas_scan_helpers import get_repos, get_repo_details, print_aggregated_metrics_from_csv
+from datetime import datetime, timezone
+from ghas_scan_helpers import create_session, get_repos, get_org_alert_counts, get_repo_details_resumable, get_unchanged_repo_details, load_scan_state, save_scan_state, write_scan_parquet, print_aggregated_metrics_from_csv
+
+parser = argparse.ArgumentParser(description='Scan the GHAS settings and alert counts of every repository for the configured owners.')
+parser.add_argument('--resume', action='store_true', help='Continue an interrupted scan from its checkpoint journal instead of starting over.')
+args = parser.parse_args()
 
 # Set the GitHub owner type, owner name, and personal access token
 owner_type = 'user'  # Options are 'org' or 'user'
@@ -16,26 +22,91 @@ if not access_token:
 skip_forks = False
 skip_archives = True
 
+# Number of repositories to fetch in parallel. Set to 1 for a serial scan.
+# Each worker makes ~7 API calls per repo, so keep this modest to avoid secondary rate limits.
+max_workers = 8
+
+# Fetch repo metadata and CODEOWNERS through the GraphQL API in batches of
+# graphql_batch_size repos instead of up to four REST calls per repo.
+use_graphql = False
+graphql_batch_size = 50
+
+# For owner_type 'org', count code scanning and Dependabot alerts from the org-wide alert
+# endpoints (one paged stream per org) instead of paging the alert endpoints of every repo.
+# Requires an org owner or security manager token; falls back to per-repo counts otherwise.
+use_org_alert_endpoints = False
+
+# Only fetch details for repos that changed since the previous scan. Listing timestamps
+# (pushed_at, updated_at) and, for orgs, recent alert activity decide what changed;
+# the rows of all other repos are carried forward from the state file of the last run.
+incremental = False
+state_filename = 'github_data.state.json'
+
+# Also write the results to a typed Parquet file (github_data.parquet). Requires pyarrow.
+write_parquet_output = False
+
+# HTTP client tuning. Connections are kept alive and shared by all workers,
+# so the pool should be at least as large as max_workers.
+http_pool_size = max_workers
+http_retries = 3  # Retries for connection errors and 5xx responses
+http_timeout = 30  # Seconds
+
+# On-disk cache for conditional requests (ETag / Last-Modified). Unchanged responses
+# come back as 304 Not Modified, which do not count against the rate limit.
+# Cache files hold the raw API responses (secret scanning URLs are never cached).
+# Set http_cache_dir to None to disable the cache.
+http_cache_dir = '.ghas_cache'
+http_cache_max_mb = 500
+
 # Set up headers with the access token
 headers = {'Authorization': f'token {access_token}'}
 
+# One pooled, keep-alive session is shared by every API call in the scan
+session = create_session(headers, pool_size=http_pool_size, retries=http_retries, timeout=http_timeout,
+                         cache_dir=http_cache_dir, cache_max_mb=http_cache_max_mb)
+
 # Get the start time
 start_time = time.time()
+scanned_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
 
 # Initialize an empty list to store all repositories
 all_repos = []
 
+# Per-org alert counts when use_org_alert_endpoints is enabled
+org_alert_counts = {}
+
 # Loop over the owner names
 for owner_name in owner_names:
     # Get list of repositories for the current owner
     print(f"Getting list of repositories for {owner_name}...")
-    repos = get_repos(owner_name, headers, owner_type, skip_forks, skip_archives)
+    repos = get_repos(owner_name, session, owner_type, skip_forks, skip_archives)
 
     # Append the repositories to the all_repos list
     all_repos.extend(repos)
 
+    if use_org_alert_endpoints and owner_type == 'org':
+        counts = get_org_alert_counts(owner_name, session)
+        if counts is not None:
+            org_alert_counts[owner_name] = counts
+
+# Rows of repos that did not change since the previous scan
+unchanged_details = {}
+if incremental:
+    previous_state = load_scan_state(state_filename)
+    if previous_state is None:
+        print(f"No previous scan state in {state_filename}. Running a full scan.")
+    else:
+        unchanged_details = get_unchanged_repo_details(all_repos, previous_state, session, owner_type)
+
+# Row of every repo in this scan, saved as the state for the next incremental scan
+repo_details_by_name = {}
+
 # Write data to CSV
 csv_filename = 'github_data.csv'
+
+# Every finished repo is appended to this journal. If the scan dies, run again with
+# --resume to skip the repos that are already done. It is removed after a full run.
+checkpoint_filename = f'{csv_filename}.checkpoint.jsonl'
 with open(csv_filename, 'w', newline='') as csvfile:
     fieldnames = ['repo_name',
                     'owner_type',
@@ -69,8 +140,12 @@ with open(csv_filename, 'w', newline='') as csvfile:
     writer.writeheader()
 
     print(f"Fetching repo security configs for {owner_name} . . . (this may take a while))")
-    for repo in all_repos:
-        repo_details = get_repo_details(repo['owner']['login'], repo['name'], headers)
+    repo_details_iter = get_repo_details_resumable(all_repos, session, checkpoint_filename, resume=args.resume,
+                                                   unchanged_details=unchanged_details,
+                                                   max_workers=max_workers, use_graphql=use_graphql,
+                                                   graphql_batch_size=graphql_batch_size, org_alert_counts=org_alert_counts)
+    for repo, repo_details in repo_details_iter:
+        repo_details_by_name[repo['full_name']] = repo_details
         
          # If repo_details is None, skip this iteration
          # Sometimes a repo can be listed but meta-info cannot be retrieved 
@@ -88,13 +163,25 @@ with open(csv_filename, 'w', newline='') as csvfile:
     csvfile.close()
     print(f"CSV file '{csv_filename}' written successfully.")
 
+    # The scan is complete, so the next run starts fresh
+    os.remove(checkpoint_filename)
+    save_scan_state(state_filename, scanned_at, all_repos, repo_details_by_name)
+
+    # The metrics are read from the Parquet file when there is one, since it loads faster
+    metrics_filename = csv_filename
+    if write_parquet_output:
+        parquet_filename = csv_filename.replace('.csv', '.parquet')
+        rows = (repo_details_by_name[repo['full_name']] for repo in all_repos if repo_details_by_name.get(repo['full_name']) is not None)
+        if write_scan_parquet(rows, fieldnames, parquet_filename):
+            metrics_filename = parquet_filename
+
     with open(csv_filename, 'r') as csvfile:
         lines = csvfile.readlines()
         if len(lines) <= 1:
             print(f"ERROR: File {csv_filename} is empty or only contains headers")
         else:
             try:
-                print_aggregated_metrics_from_csv(csv_filename)
+                print_aggregated_metrics_from_csv(metrics_filename)
             except Exception as e:
                 print(f"ERROR: An error occurred when trying to parse the file {csv_filename}: {str(e)}")
         
@@ -108,5 +195,7 @@ minutes, seconds = divmod(rem, 60)
 
 # Print the elapsed time
 print(f"Elapsed Time: {int(hours)} hours, {int(minutes)} min, {int(seconds)} seconds")
+session.print_connection_stats()
+session.rate_limiter.print_quota()
 
 print("Done.")
@@ -1,13 +1,27 @@
+import os
+import sys
+import json
 import requests
 import base64
-import pandas as pd
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared GitHub HTTP client lives in the top-level common directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+from github_client import GitHubClient
+from response_cache import ResponseCache
+from parquet_export import PARQUET_AVAILABLE, write_parquet
 
 def print_aggregated_metrics_from_csv(csv_file_name):
+    # Also accepts the .parquet file written by write_scan_parquet
+    # pandas (via report_loader) is only needed here, so it is not imported with this module
+    from report_loader import load_report
 
     df = None
     try:
         print(f"Attempting to read file: {csv_file_name}")
-        df = pd.read_csv(csv_file_name)
+        # Only the columns used below are read, typed at parse time (see common/report_loader.py)
+        df = load_report(csv_file_name, 'scan')
         print(f"File {csv_file_name} read successfully.")
     except Exception as e:
         print(f"ERROR: An error occurred when trying to parse the file {csv_file_name}: {str(e)}")
@@ -34,31 +48,49 @@ def print_aggregated_metrics_from_csv(csv_file_name):
     print(f"Total number of open critical and high code scanning alerts: {open_critical_high_alerts}")
     print(f"Total number of open critical dependabot alerts: {open_critical_dependabot_alerts}")
 
-def get_dependabot_alerts(owner, repo_name, headers):
-    dependabot_url = f'https://api.github.com/repos/{owner}/{repo_name}/dependabot/alerts'
-    dependabot_alerts = requests.get(dependabot_url, headers=headers)
+def get_pages(session, url, params=None):
+    # Yield the response for each page of a list endpoint (see GitHubClient.get_pages).
+    # Only one page is held at a time, so callers can count alerts without keeping them all.
+    return session.get_pages(url, params)
 
-    # Check if Dependabot alerts are available
-    if dependabot_alerts.status_code == 200:
-        dependabot_alerts_data = dependabot_alerts.json()
+# Severity columns of the CSV, in the order the count tuples are returned
+CODE_SCANNING_SEVERITIES = ['critical', 'high', 'medium', 'low', 'warning', 'note', 'error']
+DEPENDABOT_SEVERITIES = ['critical', 'high', 'medium', 'low']
 
-        # Check if Dependabot is enabled
-        dependabot_enabled = True if dependabot_alerts_data else False
+def has_dependabot_alerts(owner, repo_name, session):
+    # Dependabot counts as enabled when the repo has any alert, open or not.
+    # A single-item request is enough to find out.
+    dependabot_url = f'https://api.github.com/repos/{owner}/{repo_name}/dependabot/alerts'
+    response = session.get(dependabot_url, params={'per_page': 1})
+    if response.status_code == 200:
+        return True if response.json() else False
+    elif response.status_code == 403:
+        return "Access denied (403)"
+    return False
 
-        # Filter open alerts
-        open_alerts = [alert for alert in dependabot_alerts_data if alert['state'] == 'open']
+# API Ref: https://docs.github.com/en/rest/dependabot/alerts?apiVersion=2022-11-28#list-dependabot-alerts-for-a-repository
+def get_dependabot_alerts(owner, repo_name, session):
+    dependabot_url = f'https://api.github.com/repos/{owner}/{repo_name}/dependabot/alerts'
 
-        # Count the number of open alerts
-        open_alerts_count = len(open_alerts)
-
-        # Initialize severity counts
-        num_critical_dep_alerts = 0
-        num_high_dep_alerts = 0
-        num_medium_dep_alerts = 0
-        num_low_dep_alerts = 0
+    # Initialize severity counts
+    open_alerts_count = 0
+    num_critical_dep_alerts = 0
+    num_high_dep_alerts = 0
+    num_medium_dep_alerts = 0
+    num_low_dep_alerts = 0
+
+    # Only open alerts are requested, 100 per page, and counted page by page
+    # The status code of the first page decides whether Dependabot is available
+    status_code = None
+    for dependabot_alerts in get_pages(session, dependabot_url, {'state': 'open', 'per_page': 100}):
+        if status_code is None:
+            status_code = dependabot_alerts.status_code
+        if dependabot_alerts.status_code != 200:
+            break
 
         # Categorize open alerts based on severity
-        for alert in open_alerts:
+        for alert in dependabot_alerts.json():
+            open_alerts_count += 1
             severity = alert['security_advisory']['severity']
             if severity == 'critical':
                 num_critical_dep_alerts += 1
@@ -69,12 +101,16 @@ def get_dependabot_alerts(owner, repo_name, headers):
             elif severity == 'low':
                 num_low_dep_alerts += 1
 
+    # Check if Dependabot alerts are available
+    if status_code == 200:
+        # Without open alerts, check for closed ones
+        dependabot_enabled = True if open_alerts_count > 0 else has_dependabot_alerts(owner, repo_name, session)
     else:
         # print out the error message with http status code
-        #print(f"Dependabot alerts not available for {owner}/{repo_name}. Status code: {dependabot_alerts.status_code}")
+        #print(f"Dependabot alerts not available for {owner}/{repo_name}. Status code: {status_code}")
         
         # if status code is 403, then set dependabot_enabled to "Access denied (403)"
-        if dependabot_alerts.status_code == 403:
+        if status_code == 403:
             dependabot_enabled = "Access denied (403)"
         else:
             dependabot_enabled = False
@@ -94,12 +130,12 @@ def get_dependabot_alerts(owner, repo_name, headers):
     )
 
 # API Ref: https://docs.github.com/en/rest/code-scanning/code-scanning
-def get_code_scanning_tool_names(owner, repo_name, headers):
+def get_code_scanning_tool_names(owner, repo_name, session):
     url = f'https://api.github.com/repos/{owner}/{repo_name}/code-scanning/analyses'
     #print("Request URL:", url)
 
     try:
-        response = requests.get(url, headers=headers)
+        response = session.get(url)
         response.raise_for_status()  # Raises a HTTPError if the status is 4xx, 5xx
 
         data = response.json()
@@ -121,10 +157,9 @@ def get_code_scanning_tool_names(owner, repo_name, headers):
         return f"Error occurred: {err}"
 
 # API Ref: https://docs.github.com/en/rest/reference/code-scanning#list-code-scanning-alerts-for-a-repository
-def get_code_scanning_alert_counts(owner, repo_name, headers):
+def get_code_scanning_alert_counts(owner, repo_name, session):
     # Get the code scanning alerts for the repository
     url = f'https://api.github.com/repos/{owner}/{repo_name}/code-scanning/alerts'
-    response = requests.get(url, headers=headers)
 
     code_scanning_critical_alert_count = 0
     code_scanning_high_alert_count = 0
@@ -134,14 +169,13 @@ def get_code_scanning_alert_counts(owner, repo_name, headers):
     code_scanning_note_alert_count = 0
     code_scanning_error_alert_count = 0
 
-    if response.status_code == 200:
-        alerts_data = response.json()
-
-        # Filter open code scanning alerts
-        open_alerts = [alert for alert in alerts_data if alert['state'] == 'open']
+    # Only open alerts are requested, 100 per page, and counted page by page
+    for response in get_pages(session, url, {'state': 'open', 'per_page': 100}):
+        if response.status_code != 200:
+            break
 
         # Count alerts based on severity
-        for alert in open_alerts:
+        for alert in response.json():
             severity = alert['rule']['severity']
             if severity == 'critical':
                 code_scanning_critical_alert_count += 1
@@ -168,54 +202,157 @@ def get_code_scanning_alert_counts(owner, repo_name, headers):
         code_scanning_error_alert_count
     )
 
-def get_codeowners(owner, repo_name, headers):
-    codeowners_locations = [
-        f'https://api.github.com/repos/{owner}/{repo_name}/contents/CODEOWNERS',
-        f'https://api.github.com/repos/{owner}/{repo_name}/contents/.github/CODEOWNERS',
-        f'https://api.github.com/repos/{owner}/{repo_name}/contents/docs/CODEOWNERS'
-    ]
+# API Ref: https://docs.github.com/en/rest/dependabot/alerts?apiVersion=2022-11-28#list-dependabot-alerts-for-an-organization
+# API Ref: https://docs.github.com/en/rest/code-scanning/code-scanning?apiVersion=2022-11-28#list-code-scanning-alerts-for-an-organization
+def get_org_alert_counts(org, session):
+    # Page through the org-wide alert streams once and count severities per repository.
+    # Returns {'code_scanning': {repo_name: Counter}, 'dependabot': {repo_name: Counter},
+    # 'dependabot_closed': {repo_name: Counter}}, or None if any endpoint is not available
+    # (they need an org owner or security manager token).
+    # The closed Dependabot stream tells which repos without open alerts still have Dependabot
+    # alerts (i.e. Dependabot is enabled), so no repo needs its own request for that.
+    dependabot_url = f'https://api.github.com/orgs/{org}/dependabot/alerts'
+    streams = {
+        'code_scanning': (f'https://api.github.com/orgs/{org}/code-scanning/alerts', 'open', lambda alert: alert['rule']['severity']),
+        'dependabot': (dependabot_url, 'open', lambda alert: alert['security_advisory']['severity']),
+        'dependabot_closed': (dependabot_url, 'auto_dismissed,dismissed,fixed', lambda alert: alert['security_advisory']['severity'])
+    }
+
+    org_alert_counts = {}
+    for alert_type, (url, state, get_severity) in streams.items():
+        print(f"Fetching {alert_type} alerts (state: {state}) for org {org}...")
+        repo_counts = defaultdict(Counter)
+        for response in get_pages(session, url, {'state': state, 'per_page': 100}):
+            if response.status_code != 200:
+                print(f"Org {alert_type} alerts are not available for {org} (status code {response.status_code}). Falling back to per-repo alert counts.")
+                return None
+            for alert in response.json():
+                repo_counts[alert['repository']['name']][get_severity(alert)] += 1
+        org_alert_counts[alert_type] = repo_counts
+
+    return org_alert_counts
+
+# CODEOWNERS locations in the order GitHub looks for them
+CODEOWNERS_PATHS = ['CODEOWNERS', '.github/CODEOWNERS', 'docs/CODEOWNERS']
+
+def strip_codeowners_comments(codeowners):
+    # Remove comments from CODEOWNERS
+    codeowners_lines = [line for line in codeowners.split('\n') if not line.strip().startswith('#')]
+    return '\n'.join(codeowners_lines)
+
+def get_codeowners(owner, repo_name, session):
+    codeowners_locations = [f'https://api.github.com/repos/{owner}/{repo_name}/contents/{path}' for path in CODEOWNERS_PATHS]
 
     for location in codeowners_locations:
-        codeowners_response = requests.get(location, headers=headers)
+        codeowners_response = session.get(location)
 
         if codeowners_response.status_code == 200:
             codeowners_content = codeowners_response.json().get('content')
             if codeowners_content is not None:
                 codeowners = base64.b64decode(codeowners_content).decode('utf-8')
-
-                # Remove comments from CODEOWNERS
-                codeowners_lines = [line for line in codeowners.split('\n') if not line.strip().startswith('#')]
-
-                return '\n'.join(codeowners_lines)
+                return strip_codeowners_comments(codeowners)
 
     return "Not found"
 
 
-def get_repo_details(owner, repo_name, headers):
-    # Construct the repository URL using the owner and repo_name variables
-    # Docs: https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28
-    # Note: In order to see the security_and_analysis block for a repository 
-    # you must have admin permissions for the repository or be an owner or 
-    # security manager for the organization that owns the repository.
-    repo_url = f'https://api.github.com/repos/{owner}/{repo_name}'
-
-    # Send a GET request to the repo_url and retrieve the repository information
-    response = requests.get(repo_url, headers=headers)
-    repo_info = response.json()
-
-    # If the repository was not found, log the repository name and owner and return None
-    if response.status_code == 404:
-        print(f"Repository {repo_name} of owner {owner} not found. It will be skipped.")
-        print(f"Response: {repo_info}")
-        return None
+# GraphQL fields for one repository. CODEOWNERS is read as blob text from all
+# candidate paths in the same query instead of probing each path over REST.
+# Docs: https://docs.github.com/en/graphql/reference/objects#repository
+GRAPHQL_REPO_FIELDS = '''
+    name
+    pushedAt
+    createdAt
+    isFork
+    isPrivate
+    isArchived
+    codeowners_root: object(expression: "HEAD:CODEOWNERS") { ... on Blob { text } }
+    codeowners_github: object(expression: "HEAD:.github/CODEOWNERS") { ... on Blob { text } }
+    codeowners_docs: object(expression: "HEAD:docs/CODEOWNERS") { ... on Blob { text } }
+'''
+
+def get_repo_metadata_graphql(repos, session, batch_size=50):
+    # Fetch the repo metadata and CODEOWNERS for many repos with one GraphQL query per batch.
+    # Returns {(owner, name): (repo_info, codeowners)} where repo_info has the same keys as the
+    # REST repository response used by get_repo_details. Repos that GraphQL could not resolve
+    # are left out, and get_repo_details falls back to REST for them.
+    #
+    # GraphQL does not expose security_and_analysis, so it is taken from the repository
+    # listing returned by get_repos (present when the token has admin access).
+    metadata = {}
+    for start in range(0, len(repos), batch_size):
+        batch = repos[start:start + batch_size]
+        print(f"Fetching GraphQL metadata for repos {start + 1}-{start + len(batch)} of {len(repos)}...")
+
+        variable_defs = []
+        selections = []
+        variables = {}
+        for i, repo in enumerate(batch):
+            variable_defs.append(f'$owner{i}: String!, $name{i}: String!')
+            selections.append(f'r{i}: repository(owner: $owner{i}, name: $name{i}) {{ {GRAPHQL_REPO_FIELDS} }}')
+            variables[f'owner{i}'] = repo['owner']['login']
+            variables[f'name{i}'] = repo['name']
+        query = f"query({', '.join(variable_defs)}) {{ {' '.join(selections)} }}"
+
+        response = session.post('https://api.github.com/graphql', json={'query': query, 'variables': variables})
+        if response.status_code != 200:
+            print(f"GraphQL query failed with status code {response.status_code}. Falling back to REST for this batch.")
+            continue
+
+        # Errors for single repos (e.g. NOT_FOUND) come back next to partial data
+        data = response.json().get('data') or {}
+        for i, repo in enumerate(batch):
+            node = data.get(f'r{i}')
+            if node is None:
+                continue
+
+            codeowners = "Not found"
+            for alias in ['codeowners_root', 'codeowners_github', 'codeowners_docs']:
+                blob = node.get(alias)
+                if blob and blob.get('text') is not None:
+                    codeowners = strip_codeowners_comments(blob['text'])
+                    break
+
+            repo_info = {
+                'name': node['name'],
+                'pushed_at': node['pushedAt'],
+                'created_at': node['createdAt'],
+                'fork': node['isFork'],
+                'private': node['isPrivate'],
+                'archived': node['isArchived'],
+                'security_and_analysis': repo.get('security_and_analysis') or {}
+            }
+            metadata[(repo['owner']['login'], repo['name'])] = (repo_info, codeowners)
+
+    return metadata
+
+def get_repo_details(owner, repo_name, session, repo_info=None, codeowners=None, org_alert_counts=None):
+    # repo_info and codeowners can be passed in when they were already fetched in bulk
+    # (see get_repo_metadata_graphql). Otherwise they are fetched over REST here.
+    # Likewise, org_alert_counts from get_org_alert_counts replaces the per-repo alert calls.
+    if repo_info is None:
+        # Construct the repository URL using the owner and repo_name variables
+        # Docs: https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28
+        # Note: In order to see the security_and_analysis block for a repository 
+        # you must have admin permissions for the repository or be an owner or 
+        # security manager for the organization that owns the repository.
+        repo_url = f'https://api.github.com/repos/{owner}/{repo_name}'
+
+        # Send a GET request to the repo_url and retrieve the repository information
+        response = session.get(repo_url)
+        repo_info = response.json()
+
+        # If the repository was not found, log the repository name and owner and return None
+        if response.status_code == 404:
+            print(f"Repository {repo_name} of owner {owner} not found. It will be skipped.")
+            print(f"Response: {repo_info}")
+            return None
     
     # Print the repo_info dictionary
     #print(f"repo_info for {repo_name}: {repo_info}")
-    # Print the status code of the response
-    #print(f"Status code for {repo_name}: {response.status_code}")
 
     # Get CODEOWNERS file
-    codeowners = get_codeowners(owner, repo_name, headers)
+    if codeowners is None:
+        codeowners = get_codeowners(owner, repo_name, session)
 
     # Get last and first commit dates directly from the repo_details
     # Get the last commit date
@@ -250,18 +387,30 @@ def get_repo_details(owner, repo_name, headers):
     secret_scanning_push_protection_enabled = secret_scanning_push_protection.get('status') == 'enabled' if secret_scanning_push_protection else False    
     
     # Get names of code scanners
-    code_scanners_enabled = get_code_scanning_tool_names(owner, repo_name, headers)
+    code_scanners_enabled = get_code_scanning_tool_names(owner, repo_name, session)
     # print out results of code_scanners_enabled with repo name
     print(f"Repo: {repo_info['name']}, code_scanners_enabled: {code_scanners_enabled}")
 
-    code_scanning_critical_alert_count,code_scanning_high_alert_count,code_scanning_medium_alert_count,code_scanning_low_alert_count,code_scanning_warning_alert_count,code_scanning_note_alert_count,code_scanning_error_alert_count = get_code_scanning_alert_counts(owner, repo_name, headers)
+    if org_alert_counts is not None:
+        severities = org_alert_counts['code_scanning'].get(repo_name, Counter())
+        code_scanning_alert_counts = tuple(severities[severity] for severity in CODE_SCANNING_SEVERITIES)
+    else:
+        code_scanning_alert_counts = get_code_scanning_alert_counts(owner, repo_name, session)
+    code_scanning_critical_alert_count,code_scanning_high_alert_count,code_scanning_medium_alert_count,code_scanning_low_alert_count,code_scanning_warning_alert_count,code_scanning_note_alert_count,code_scanning_error_alert_count = code_scanning_alert_counts
 
     security_and_analysis_enabled = False
     if code_scanners_enabled != "None" and "Access denied" not in code_scanners_enabled:
         security_and_analysis_enabled = True
 
     # Check the number of Dependabot alerts
-    dependabot_enabled, open_alerts_count, num_critical_dep_alerts, num_high_dep_alerts, num_medium_dep_alerts, num_low_dep_alerts = get_dependabot_alerts(owner, repo_name, headers)
+    if org_alert_counts is not None:
+        severities = org_alert_counts['dependabot'].get(repo_name, Counter())
+        open_alerts_count = sum(severities.values())
+        dependabot_enabled = open_alerts_count > 0 or repo_name in org_alert_counts['dependabot_closed']
+        dependabot_alerts = (dependabot_enabled, open_alerts_count) + tuple(severities[severity] for severity in DEPENDABOT_SEVERITIES)
+    else:
+        dependabot_alerts = get_dependabot_alerts(owner, repo_name, session)
+    dependabot_enabled, open_alerts_count, num_critical_dep_alerts, num_high_dep_alerts, num_medium_dep_alerts, num_low_dep_alerts = dependabot_alerts
 
     return {
         'repo_name': repo_info['name'],
@@ -290,9 +439,177 @@ def get_repo_details(owner, repo_name, headers):
         'num_low_dep_alerts': num_low_dep_alerts
         # Add other details here
     }
-   
 
-def get_repos(owner, headers, owner_type, skip_forks=False, skip_archived=True):
+def get_repo_details_concurrently(repos, session, max_workers=8, use_graphql=False, graphql_batch_size=50, org_alert_counts=None):
+    # Fetch get_repo_details for many repos using a bounded pool of worker threads.
+    # Each repo is still fetched by a single worker, so the per-repo calls are unchanged.
+    # Results are yielded as (repo, repo_details) in the same order as the input list,
+    # so the CSV output is identical to a serial scan regardless of which repo finishes first.
+    # All workers share the same session, so the session's pool size should be >= max_workers.
+    #
+    # With use_graphql, repo metadata and CODEOWNERS are fetched up front in GraphQL batches,
+    # which replaces up to four REST calls per repo with one query per graphql_batch_size repos.
+    #
+    # org_alert_counts maps an owner to its get_org_alert_counts result. Repos of those owners
+    # take their alert counts from it instead of paging the per-repo alert endpoints.
+    org_alert_counts = org_alert_counts or {}
+    metadata = get_repo_metadata_graphql(repos, session, graphql_batch_size) if use_graphql else {}
+
+    def fetch(repo):
+        owner = repo['owner']['login']
+        repo_info, codeowners = metadata.get((owner, repo['name']), (None, None))
+        return get_repo_details(owner, repo['name'], session, repo_info, codeowners, org_alert_counts.get(owner))
+
+    if max_workers <= 1:
+        for repo in repos:
+            yield repo, fetch(repo)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(fetch, repos)
+        for repo, repo_details in zip(repos, results):
+            yield repo, repo_details
+
+
+def load_checkpoint(checkpoint_filename):
+    # Read the checkpoint journal written by get_repo_details_resumable.
+    # Returns {full_name: repo_details}; repo_details is None for repos that were skipped.
+    completed = {}
+    if not os.path.isfile(checkpoint_filename):
+        return completed
+    with open(checkpoint_filename, 'r') as checkpoint_file:
+        for line in checkpoint_file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash; that repo is fetched again
+                continue
+            completed[entry['full_name']] = entry['repo_details']
+    return completed
+
+def append_checkpoint(checkpoint_file, full_name, repo_details):
+    # Each repo is one JSON line, written with a single call and flushed to disk before
+    # the scan moves on, so a crash can at most lose the line being written.
+    checkpoint_file.write(json.dumps({'full_name': full_name, 'repo_details': repo_details}) + '\n')
+    checkpoint_file.flush()
+    os.fsync(checkpoint_file.fileno())
+
+def get_repo_details_resumable(repos, session, checkpoint_filename, resume=False, unchanged_details=None, **kwargs):
+    # Same as get_repo_details_concurrently, but every finished repo is appended to a
+    # checkpoint journal. With resume=True, repos already in the journal are not fetched
+    # again and their saved rows are yielded in place, still in the order of repos.
+    # unchanged_details ({full_name: repo_details}) holds rows carried forward from a
+    # previous scan (see get_unchanged_repo_details); those repos are not fetched either.
+    completed = load_checkpoint(checkpoint_filename) if resume else {}
+    if completed:
+        print(f"Resuming from {checkpoint_filename}: {len(completed)} of {len(repos)} repos already done.")
+    if unchanged_details:
+        completed = {**unchanged_details, **completed}
+
+    pending = [repo for repo in repos if repo['full_name'] not in completed]
+    fetched = get_repo_details_concurrently(pending, session, **kwargs)
+
+    with open(checkpoint_filename, 'a' if resume else 'w') as checkpoint_file:
+        for repo in repos:
+            if repo['full_name'] in completed:
+                yield repo, completed[repo['full_name']]
+                continue
+            _, repo_details = next(fetched)
+            append_checkpoint(checkpoint_file, repo['full_name'], repo_details)
+            yield repo, repo_details
+
+def load_scan_state(state_filename):
+    # State saved by the previous scan: {'scanned_at': ISO time, 'repos': {full_name: {...}}}
+    if not os.path.isfile(state_filename):
+        return None
+    with open(state_filename, 'r') as state_file:
+        return json.load(state_file)
+
+def save_scan_state(state_filename, scanned_at, repos, repo_details_by_name):
+    # Keep the listing timestamps and row of every repo so the next scan can carry them forward
+    state = {
+        'scanned_at': scanned_at,
+        'repos': {
+            repo['full_name']: {
+                'pushed_at': repo.get('pushed_at'),
+                'updated_at': repo.get('updated_at'),
+                'repo_details': repo_details_by_name.get(repo['full_name'])
+            }
+            for repo in repos
+        }
+    }
+    # Write to a temporary file first so a crash never leaves a half-written state file
+    tmp_filename = f'{state_filename}.tmp'
+    with open(tmp_filename, 'w') as state_file:
+        json.dump(state, state_file)
+    os.replace(tmp_filename, state_filename)
+
+def get_repos_with_alert_activity(org, session, since):
+    # Names of the repos in an org with a code scanning or Dependabot alert created, fixed,
+    # dismissed or reopened since the given ISO time. The org alert streams are read newest
+    # update first and paging stops at the first alert older than since.
+    # Returns None if the org endpoints are not available.
+    urls = [
+        f'https://api.github.com/orgs/{org}/code-scanning/alerts',
+        f'https://api.github.com/orgs/{org}/dependabot/alerts'
+    ]
+    repo_names = set()
+    for url in urls:
+        for response in get_pages(session, url, {'sort': 'updated', 'direction': 'desc', 'per_page': 100}):
+            if response.status_code != 200:
+                print(f"Org alerts are not available for {org} (status code {response.status_code}). Only repo timestamps will be used to find changes.")
+                return None
+            alerts = response.json()
+            for alert in alerts:
+                if alert['updated_at'] < since:
+                    break
+                repo_names.add(alert['repository']['name'])
+            if alerts and alerts[-1]['updated_at'] < since:
+                break
+    return repo_names
+
+def get_unchanged_repo_details(repos, previous_state, session, owner_type):
+    # Split repos into those that need fetching and rows that can be carried forward from the
+    # previous scan. A repo is fetched again if it is new, if its pushed_at or updated_at in the
+    # listing moved, if it was skipped last time, or (for orgs) if one of its alerts changed.
+    previous_repos = previous_state['repos']
+    active_repos = {}
+    if owner_type == 'org':
+        for owner in set(repo['owner']['login'] for repo in repos):
+            active_repos[owner] = get_repos_with_alert_activity(owner, session, previous_state['scanned_at'])
+
+    unchanged_details = {}
+    for repo in repos:
+        previous = previous_repos.get(repo['full_name'])
+        if previous is None or previous['repo_details'] is None:
+            continue
+        if previous['pushed_at'] != repo.get('pushed_at') or previous['updated_at'] != repo.get('updated_at'):
+            continue
+        alert_activity = active_repos.get(repo['owner']['login'])
+        if owner_type == 'org' and (alert_activity is None or repo['name'] in alert_activity):
+            continue
+        unchanged_details[repo['full_name']] = previous['repo_details']
+
+    print(f"Incremental scan: {len(repos) - len(unchanged_details)} of {len(repos)} repos changed since {previous_state['scanned_at']}.")
+    return unchanged_details
+
+def write_scan_parquet(rows, fieldnames, parquet_filename):
+    # Write the scan rows to a typed Parquet file next to the CSV (booleans, integers and
+    # timestamps keep their types). Returns False if pyarrow is not installed.
+    if not PARQUET_AVAILABLE:
+        print("Parquet output needs pyarrow (pip install pyarrow). Only the CSV was written.")
+        return False
+    count = write_parquet(rows, fieldnames, parquet_filename)
+    print(f"Parquet file '{parquet_filename}' written successfully ({count} repos).")
+    return True
+
+def create_session(headers, pool_size=10, retries=3, timeout=30, cache_dir=None, cache_max_mb=500):
+    # One pooled, keep-alive client shared by every helper in this module.
+    # With a cache_dir, GET requests are conditional and unchanged responses come from disk.
+    cache = ResponseCache(cache_dir, cache_max_mb) if cache_dir else None
+    return GitHubClient(headers=headers, pool_size=pool_size, retries=retries, timeout=timeout, cache=cache)
+
+def get_repos(owner, session, owner_type, skip_forks=False, skip_archived=True):
     if owner_type == 'user':
         repos_url = f'https://api.github.com/users/{owner}/repos'
     elif owner_type == 'org':
@@ -306,7 +623,7 @@ def get_repos(owner, headers, owner_type, skip_forks=False, skip_archived=True):
 
     while True:
         print(f"Fetching page {page}...")
-        response = requests.get(f"{repos_url}?page={page}&per_page={repos_per_page}", headers=headers)
+        response = session.get(f"{repos_url}?page={page}&per_page={repos_per_page}")
 
         if response.status_code == 200:
             page_repos = response.json()
@@ -1,34 +1,46 @@
 import argparse
+import os
 import requests
 import sys
 import json
+from concurrent.futures import ThreadPoolExecutor
 
-def get_security_settings(org, token, verbose):
+# Shared GitHub HTTP client lives in the top-level common directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+from github_client import GitHubClient
+
+fields = [
+    "dependency_graph_enabled_for_new_repositories",
+    "dependabot_alerts_enabled_for_new_repositories",
+    "dependabot_security_updates_enabled_for_new_repositories",
+    "advanced_security_enabled_for_new_repositories",
+    "secret_scanning_enabled_for_new_repositories",
+    "secret_scanning_push_protection_enabled_for_new_repositories",
+    "secret_scanning_push_protection_custom_link",
+    "secret_scanning_push_protection_custom_link_enabled"
+]
+
+# Number of orgs read or updated at the same time in multi-org mode
+MAX_WORKERS = 10
+
+def get_security_settings(org, token, verbose, session=None):
     url = f"https://api.github.com/orgs/{org}"
     headers = {'Authorization': f'token {token}'}
-    response = requests.get(url, headers=headers)
+    response = (session or requests).get(url, headers=headers)
     data = response.json()
 
-    fields = [
-        "dependency_graph_enabled_for_new_repositories",
-        "dependabot_alerts_enabled_for_new_repositories",
-        "dependabot_security_updates_enabled_for_new_repositories",
-        "advanced_security_enabled_for_new_repositories",
-        "secret_scanning_enabled_for_new_repositories",
-        "secret_scanning_push_protection_enabled_for_new_repositories",
-        "secret_scanning_push_protection_custom_link",
-        "secret_scanning_push_protection_custom_link_enabled"
-    ]
-
     if verbose:
-        for field in fields:
-            if field in data:
-                print(f"{field}: {data[field]}")
-            else:
-                print(f"{field} not found in the response.")
+        print_settings(data)
 
     return data
 
+def print_settings(data, prefix=''):
+    for field in fields:
+        if field in data:
+            print(f"{prefix}{field}: {data[field]}")
+        else:
+            print(f"{prefix}{field} not found in the response.")
+
 def update_security_settings(org, token, new_settings):
     url = f"https://api.github.com/orgs/{org}"
     headers = {'Authorization': f'token {token}'}
@@ -37,34 +49,133 @@ def update_security_settings(org, token, new_settings):
         print(f"Error: Failed to update security settings. Server responded with status code {response.status_code}.", file=sys.stderr)
         sys.exit(1)
 
+def get_drift(settings, new_settings):
+    # The fields whose current value differs from the desired one, as {field: (current, desired)}
+    return {field: (settings.get(field), desired) for field, desired in new_settings.items() if settings.get(field) != desired}
+
+def print_drift_table(drift_by_org, errors):
+    # One line per drifted field: org, field, current value and desired value
+    rows = [(org, field, json.dumps(current), json.dumps(desired))
+            for org, drift in drift_by_org.items() for field, (current, desired) in drift.items()]
+    rows += [(org, 'ERROR', error, '') for org, error in errors.items()]
+    if not rows:
+        print("No drift: every org already has the desired settings.")
+        return
+    header = ('ORG', 'FIELD', 'CURRENT', 'DESIRED')
+    widths = [max(len(row[i]) for row in rows + [header]) for i in range(len(header))]
+    for row in [header] + rows:
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+    drifted = sum(1 for drift in drift_by_org.values() if drift)
+    print(f"{drifted} of {len(drift_by_org) + len(errors)} orgs drift from the desired settings ({len(rows) - len(errors)} fields), {len(errors)} could not be read.")
+
+def audit_orgs(orgs, token, new_settings, verbose, assume_yes):
+    # Reads the settings of all orgs concurrently, prints the drift from new_settings, and after one
+    # confirmation patches each drifted org with only its changed fields, in parallel
+    client = GitHubClient(pool_size=MAX_WORKERS)
+
+    def read(org):
+        # A non-JSON error body (e.g. a 502 HTML page) is recorded for this org instead of aborting the audit
+        try:
+            return get_security_settings(org, token, False, client)
+        except ValueError:
+            return {'message': 'Response was not valid JSON'}
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = list(executor.map(read, orgs))
+
+    drift_by_org = {}
+    errors = {}
+    for org, settings in zip(orgs, results):
+        if 'login' not in settings:
+            errors[org] = settings.get('message', 'Unexpected response')
+        else:
+            if verbose:
+                # Printed after all reads finish, so the lines of different orgs don't interleave
+                print_settings(settings, prefix=f"{org}: ")
+            drift_by_org[org] = get_drift(settings, new_settings) if new_settings is not None else {}
+
+    if new_settings is None:
+        # Without desired settings, print the current settings of every org
+        for org, settings in zip(orgs, results):
+            if org not in errors:
+                print(f"{org}: " + ', '.join(f"{field}={settings.get(field)}" for field in fields))
+        for org, error in errors.items():
+            print(f"{org}: ERROR {error}")
+        return
+
+    print_drift_table(drift_by_org, errors)
+    changes = {org: {field: desired for field, (_, desired) in drift.items()} for org, drift in drift_by_org.items() if drift}
+    if not changes:
+        return
+    if not assume_yes:
+        confirmation = input(f"Apply the changed fields to {len(changes)} orgs? Please confirm (y/n): ")
+        if confirmation.lower() != 'y':
+            print("Operation cancelled.")
+            return
+
+    def apply(org):
+        response = client.patch(f"https://api.github.com/orgs/{org}", headers={'Authorization': f'token {token}'}, json=changes[org])
+        return org, response.status_code
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for org, status_code in executor.map(apply, changes):
+            if status_code == 200:
+                print(f"{org}: updated {', '.join(changes[org])}")
+            else:
+                failed += 1
+                print(f"Error: Failed to update security settings for {org}. Server responded with status code {status_code}.", file=sys.stderr)
+    print(f"Updated {len(changes) - failed} of {len(changes)} orgs.")
+    if failed:
+        sys.exit(1)
+
+def load_settings_file(filename):
+    try:
+        with open(filename, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print(f"Error: The file {filename} does not exist.", file=sys.stderr)
+        sys.exit(1)
+    except json.JSONDecodeError:
+        print(f"Error: The file {filename} is not valid JSON.", file=sys.stderr)
+        sys.exit(1)
+
 def main():
     parser = argparse.ArgumentParser(description='Get security settings for an organization.')
-    parser.add_argument('org', help='The name of the organization.')
+    parser.add_argument('org', help='The name of the organization, or a comma-separated list of organizations to audit together.')
     parser.add_argument('token', help='The personal access token.')
     parser.add_argument('--org-security-settings', help='The input file with security settings.', default=None)
     parser.add_argument('--verbose', action='store_true', help='Print all JSON responses to stdout.')
+    parser.add_argument('--orgs-file', help='A file with one organization per line, audited together with any orgs given as org.', default=None)
+    parser.add_argument('--yes', action='store_true', help='In multi-org mode, apply the changed fields without asking for confirmation.')
     args = parser.parse_args()
 
-    settings = get_security_settings(args.org, args.token, args.verbose)
-    #print(f"Security settings for {args.org}: {settings}")
+    orgs = [org.strip() for org in args.org.split(',') if org.strip()]
+    if args.orgs_file:
+        with open(args.orgs_file) as f:
+            orgs += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    orgs = list(dict.fromkeys(orgs))
+    if len(orgs) > 1 or args.orgs_file:
+        new_settings = load_settings_file(args.org_security_settings) if args.org_security_settings else None
+        audit_orgs(orgs, args.token, new_settings, args.verbose, args.yes)
+        return
+
+    if not orgs:
+        parser.error("No organization given.")
+    # The parsed name, without the spaces or trailing comma the argument may have had
+    org = orgs[0]
+    settings = get_security_settings(org, args.token, args.verbose)
+    #print(f"Security settings for {org}: {settings}")
 
     if args.org_security_settings:
-        try:
-            with open(args.org_security_settings, 'r') as f:
-                new_settings = json.load(f)
-            print(f"Do you want to write these settings to {args.org}?")
-            print(json.dumps(new_settings, indent=4))
-            confirmation = input("Please confirm (y/n): ")
-            if confirmation.lower() == 'y':
-                update_security_settings(args.org, args.token, new_settings)
-            else:
-                print("Operation cancelled.")
-        except FileNotFoundError:
-            print(f"Error: The file {args.org_security_settings} does not exist.", file=sys.stderr)
-            sys.exit(1)
-        except json.JSONDecodeError:
-            print(f"Error: The file {args.org_security_settings} is not valid JSON.", file=sys.stderr)
-            sys.exit(1)
+        new_settings = load_settings_file(args.org_security_settings)
+        print(f"Do you want to write these settings to {org}?")
+        print(json.dumps(new_settings, indent=4))
+        confirmation = input("Please confirm (y/n): ")
+        if confirmation.lower() == 'y':
+            update_security_settings(org, args.token, new_settings)
+        else:
+            print("Operation cancelled.")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -6,37 +6,84 @@ from datetime import datetime, timezone
 import os
 import pandas as pd
 import collections
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+
+# Shared GitHub HTTP client lives in the top-level common directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+from github_client import GitHubClient
+from response_cache import ResponseCache
+from alert_store import AlertStore
+from alert_schema import get_csv_headers, to_schema_row
+from alert_flattener import AlertFlattener
+from parquet_export import PARQUET_AVAILABLE, write_parquet
+from report_loader import load_report
+
+# Number of pages fetched in parallel per alert stream when the API returns a 'last' link
+# with page numbers. Set to 1 to always follow the 'next' links one page at a time.
+MAX_PARALLEL_PAGES = 8
+
+# SLA in days for open alerts, by report alert type and severity. Severities are matched
+# case-insensitively; 'default' applies to unlisted severities and to alerts without one
+# (secret scanning alerts have no severity).
+SLA_DAYS = {
+    'secrets': {'default': 7},
+    'dependencies': {'critical': 7, 'high': 30, 'medium': 90, 'low': 180, 'default': 90},
+    'code_scanning': {'critical': 7, 'high': 30, 'medium': 90, 'low': 180, 'error': 30, 'warning': 90, 'note': 180, 'default': 90},
+}
+
+# Column holding the severity of each report alert type
+SEVERITY_COLUMNS = {
+    'dependencies': 'security_advisory_severity',
+    'code_scanning': 'rule_security_severity_level',
+}
+
+# Adds the SLA columns to a DataFrame of open alerts, using whole-column arithmetic:
+# sla_days is the SLA for the alert's severity, sla is the number of days past the SLA
+# (negative while still within it) and sla_status says whether the SLA is breached.
+# `now` is the single reference time used for every alert in the report.
+def add_sla_columns(df, alert_type, now):
+    sla_days = SLA_DAYS[alert_type]
+    default_days = sla_days['default']
+    severity_column = SEVERITY_COLUMNS.get(alert_type)
+
+    if severity_column in df.columns:
+        # get_code_scanning_alerts writes 'N/A' when a tool gives no security severity. read_csv turns
+        # it into NaN but Parquet keeps the string, so both it and empty strings count as missing.
+        severity = df[severity_column].astype('string').replace({'N/A': pd.NA, '': pd.NA})
+        # Code scanning alerts from non-security tools only have a rule_severity (error, warning, note)
+        if alert_type == 'code_scanning' and 'rule_severity' in df.columns:
+            severity = severity.fillna(df['rule_severity'].astype('string'))
+        df['sla_days'] = severity.str.lower().map(sla_days).fillna(default_days)
+    else:
+        df['sla_days'] = default_days
+
+    age_days = (now - df['created_at']).dt.total_seconds() / 86400
+    df['sla'] = age_days - df['sla_days']
+    df['sla_breached'] = df['sla'] > 0
+    df['sla_status'] = '- (no SLA breach)'
+    df.loc[df['sla_breached'], 'sla_status'] = '+ (breach SLA)'
+    return df
 
 def generate_report(org, secrets_file, dependencies_file, code_scanning_file):
-    # Define a helper function to load data
-    def load_data(file):
+    # Define a helper function to load data.
+    # Only the columns generate_report uses are read, typed at parse time (see common/report_loader.py)
+    def load_data(file, report_type):
         if os.path.isfile(file):
-            df = pd.read_csv(file, on_bad_lines='skip')
+            df = load_report(file, report_type)
             if df.empty or not set(['state', 'created_at']).issubset(df.columns):
                 print(f"File {file} is empty or does not have necessary columns.")
                 return None
-            df['created_at'] = pd.to_datetime(df['created_at'])
             return df
         else:
             print(f"File {file} does not exist.")
             return None
         
     # Load data
-    secrets_df = load_data(secrets_file)
-    dependencies_df = load_data(dependencies_file)
-    code_scanning_df = load_data(code_scanning_file)
-    
-    # Convert 'created_at' to datetime
-    for df in [secrets_df, dependencies_df, code_scanning_df]:
-        if df is not None and 'created_at' in df.columns:
-            df['created_at'] = pd.to_datetime(df['created_at'])
-        elif df is not None:
-            print("DataFrame does not have a 'created_at' column.")
-        else:
-            print("DataFrame is None.")
-
-    # Define SLA in hours
-    sla_days = 7  # 7 days SLA
+    secrets_df = load_data(secrets_file, 'secrets')
+    dependencies_df = load_data(dependencies_file, 'dependencies')
+    code_scanning_df = load_data(code_scanning_file, 'code_scanning')
 
     # Filter on open if the DataFrame is not empty
     if secrets_df is not None and not secrets_df.empty:
@@ -59,55 +106,79 @@ def generate_report(org, secrets_file, dependencies_file, code_scanning_file):
     print(f'Number of open critical alerts for dependencies for {org}: {len(filtered_dependencies_df) if filtered_dependencies_df is not None and not filtered_dependencies_df.empty else 0}')
     print(f'Number of open critical alerts for code scanning for {org}: {len(filtered_code_scanning_df) if filtered_code_scanning_df is not None and not filtered_code_scanning_df.empty else 0}')
 
+    # Every alert's age is measured against the same point in time
+    now = pd.Timestamp.now(tz='UTC')
+
     print('--------------------------')
     print('Open critical alerts with SLA status:')
     print('--------------------------')
     for df, alert_type in zip([filtered_secrets_df, filtered_dependencies_df, filtered_code_scanning_df], ['secrets', 'dependencies', 'code_scanning']):
         if df is not None and not df.empty:
-            df = df.copy()  # Create a copy of the DataFrame
-            df['sla'] = df['created_at'].apply(lambda x: (datetime.now(timezone.utc) - x).total_seconds() / 86400 - sla_days)
-            df['sla_status'] = df['sla'].apply(lambda x: '+ (breach SLA)' if x > sla_days else '- (no SLA breach)')
-            df['sla'] = df['sla'].apply(lambda x: f'{x} days')  # Add units to the sla column
+            df = add_sla_columns(df.copy(), alert_type, now)
+            df['sla'] = df['sla'].round(1).astype(str) + ' days'  # Add units to the sla column
             df['alert_type'] = alert_type
             print(df[['alert_type', 'html_url', 'sla', 'sla_status']])
 
-# This function is used to flatten a nested dictionary. 
-# The arguments are a dictionary to flatten (dd), a separator for the keys (separator), and a prefix for the keys (prefix).
-def flatten_dict(d, parent_key='', sep='_'):
-    items = []
-    for k, v in d.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, collections.MutableMapping):
-            items.extend(flatten_dict(v, new_key, sep=sep).items())
-        else:
-            items.append((new_key, v))
-    return dict(items)
+            breached_df = df[df['sla_breached']]
+            print(f'{len(breached_df)} of {len(df)} open {alert_type} alerts are past their SLA')
+            if not breached_df.empty and 'repository_full_name' in breached_df.columns:
+                print(f'SLA breaches by repository ({alert_type}):')
+                print(breached_df.groupby('repository_full_name', observed=True).size().sort_values(ascending=False).to_string())
 
 def write_to_csv(alerts, alert_type, org, filename):
+    # alerts can be any iterable, e.g. a generator over pages as they are fetched.
+    # Rows are written as they arrive, so the full alert set is never held in memory.
+    # The columns come from the schema of the alert type (see common/alert_schema.py), so the
+    # header is known before the first row and keys not in the schema go to 'extra_fields'.
+    # Returns the number of alerts written.
+    alerts = iter(alerts)
+    first_alert = next(alerts, None)
 
-    if not isinstance(alerts, list) or not alerts:
-        print(f'Skipping {alert_type} alerts for {org} because there were no alerts or alerts is not a list')
-        return 
+    if first_alert is None:
+        print(f'Skipping {alert_type} alerts for {org} because there were no alerts')
+        return 0
 
-    if not isinstance(alerts[0], dict):
-        print(f'Alerts are not in the expected format. Alerts: {alerts}')
-        return 
+    if not isinstance(first_alert, dict):
+        print(f'Alerts are not in the expected format. Alert: {first_alert}')
+        return 0
 
-    # Define the CSV headers based on the keys of the first alert
-    csv_headers = list(alerts[0].keys())
+    csv_headers = get_csv_headers(alert_type)
+    known_headers = set(csv_headers)
 
     os.makedirs('_reports', exist_ok=True)  # Create _reports directory if it doesn't exist
     print(f'Writing alert to {filename}')
+    count = 0
     with open(filename, 'w', newline='') as file:
         writer = csv.DictWriter(file, fieldnames=csv_headers)
         writer.writeheader()
-        for alert in alerts:
-            # If new keys are introduced, add them to the fieldnames and update the writer
-            new_keys = set(alert.keys()) - set(csv_headers)
-            if new_keys:
-                csv_headers.extend(new_keys)
-                writer = csv.DictWriter(file, fieldnames=csv_headers)
-            writer.writerow(alert)
+        for alert in itertools.chain([first_alert], alerts):
+            writer.writerow(to_schema_row(alert, known_headers))
+            count += 1
+    return count
+
+def write_to_parquet(alerts, alert_type, org, filename):
+    # Same as write_to_csv but writes a typed Parquet file (see common/parquet_export.py).
+    # Returns the number of alerts written.
+    alerts = iter(alerts)
+    first_alert = next(alerts, None)
+
+    if first_alert is None:
+        print(f'Skipping {alert_type} alerts for {org} because there were no alerts')
+        return 0
+
+    csv_headers = get_csv_headers(alert_type)
+    known_headers = set(csv_headers)
+
+    os.makedirs('_reports', exist_ok=True)  # Create _reports directory if it doesn't exist
+    print(f'Writing alert to {filename}')
+    rows = (to_schema_row(alert, known_headers) for alert in itertools.chain([first_alert], alerts))
+    return write_parquet(rows, csv_headers, filename)
+
+def write_alerts(alerts, alert_type, org, filename):
+    # Pick the writer from the file extension
+    if filename.endswith('.parquet'):
+        return write_to_parquet(alerts, alert_type, org, filename)
+    return write_to_csv(alerts, alert_type, org, filename)
 
 def get_github_token():
     try:
@@ -118,21 +189,156 @@ def get_github_token():
         print(f"Failed to get GitHub token via gh: {e}")
         return None
 
-def fetch_alerts_generic(url, headers, params):
-    alerts = []
+def get_page_urls(last_url):
+    # Build the URLs of pages 2..N from the 'last' link, or None if it does not use page numbers
+    parsed = urlparse(last_url)
+    query = parse_qs(parsed.query)
+    if 'page' not in query:
+        return None
+    last_page = int(query['page'][0])
+    page_urls = []
+    for page in range(2, last_page + 1):
+        query['page'] = [str(page)]
+        page_urls.append(urlunparse(parsed._replace(query=urlencode(query, doseq=True))))
+    return page_urls
+
+def iterate_alert_pages(client, url, headers, params, alert_type='alerts', max_parallel_pages=MAX_PARALLEL_PAGES):
+    # Yield each page of alerts in order. If the first response has a 'last' link with page
+    # numbers, the remaining pages are requested in parallel (at most max_parallel_pages at a
+    # time). Otherwise, e.g. for cursor-based pagination, the 'next' links are followed one by one.
+    # Alerts can move to another page while pages are fetched, so duplicates are dropped.
+    seen_urls = set()
+    fetched_count = 0
+
+    def dedupe(alerts):
+        unique_alerts = []
+        for alert in alerts:
+            if alert['url'] not in seen_urls:
+                seen_urls.add(alert['url'])
+                unique_alerts.append(alert)
+        return unique_alerts
+
+    try:
+        # The client waits out primary/secondary rate limits and retries, so a 403 here is a real error
+        response = client.get(url, headers=headers, params=params)
+        response.raise_for_status()  # Raise an HTTPError if an error occurred
+    except requests.exceptions.RequestException as e:
+        print(f"An error occurred while fetching alerts: {e}")
+        return
+
+    alerts = dedupe(response.json())
+    fetched_count += len(alerts)
+    print(f'[{alert_type}] page 1: {fetched_count} alerts so far')
+    yield alerts
+
+    last_url = response.links.get('last', {}).get('url')
+    page_urls = get_page_urls(last_url) if last_url and max_parallel_pages > 1 else None
+
+    if page_urls:
+        def fetch_page(page_url):
+            page_response = client.get(page_url, headers=headers)
+            page_response.raise_for_status()
+            return page_response.json()
+
+        print(f'[{alert_type}] fetching {len(page_urls)} more pages, {max_parallel_pages} at a time')
+        with ThreadPoolExecutor(max_workers=max_parallel_pages) as executor:
+            # Keep a bounded window of pages in flight and yield them in order, whichever
+            # finishes first. The window keeps memory flat when the consumer is slower.
+            pending_pages = collections.deque()
+            next_urls = iter(page_urls)
+            for page_url in itertools.islice(next_urls, max_parallel_pages):
+                pending_pages.append(executor.submit(fetch_page, page_url))
+            page_number = 1
+            while pending_pages:
+                try:
+                    alerts = dedupe(pending_pages.popleft().result())
+                except requests.exceptions.RequestException as e:
+                    print(f"An error occurred while fetching alerts: {e}")
+                    for future in pending_pages:
+                        future.cancel()
+                    break
+                for page_url in itertools.islice(next_urls, 1):
+                    pending_pages.append(executor.submit(fetch_page, page_url))
+                page_number += 1
+                fetched_count += len(alerts)
+                print(f'[{alert_type}] page {page_number}: {fetched_count} alerts so far')
+                yield alerts
+        return
+
+    url = response.links.get('next', {}).get('url')  # Get the URL for the next page
+    page_number = 1
     while url:
         try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()  # Raise an HTTPError if an error occurred
-            alerts.extend(response.json())
-            url = response.links.get('next', {}).get('url')  # Get the URL for the next page
+            response = client.get(url, headers=headers, params=params)
+            response.raise_for_status()
         except requests.exceptions.RequestException as e:
             print(f"An error occurred while fetching alerts: {e}")
             break
-    return alerts
+        alerts = dedupe(response.json())
+        fetched_count += len(alerts)
+        page_number += 1
+        print(f'[{alert_type}] page {page_number}: {fetched_count} alerts so far')
+        yield alerts
+        url = response.links.get('next', {}).get('url')
+
+def fetch_alerts_generic(client, url, headers, params, alert_type='alerts'):
+    # Yield alerts one at a time; only the page being written is kept in memory
+    for page in iterate_alert_pages(client, url, headers, params, alert_type):
+        yield from page
+
+def sync_alerts(client, url, headers, params, store, org, alert_type):
+    # Incremental alternative to fetch_alerts_generic. Pages through the alerts most recently
+    # updated first and stops at the high-water mark of the previous sync, upserts what changed
+    # into the local store, and returns an iterator over every stored alert of this type for the org.
+    high_water_mark = store.get_high_water_mark(org, alert_type)
+    sync_params = dict(params, sort='updated', direction='desc')
+    new_high_water_mark = high_water_mark
+    synced_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    updated_count = 0
+
+    while url:
+        try:
+            response = client.get(url, headers=headers, params=sync_params)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            # Keep the old high-water mark so the next sync picks up what was missed
+            print(f"An error occurred while syncing {alert_type} alerts: {e}")
+            return store.get_alerts(org, alert_type)
+
+        # Alerts updated at exactly the high-water mark are upserted again, which is harmless
+        # and makes sure none updated in the same second as the last sync are missed
+        page = response.json()
+        changed = [alert for alert in page if high_water_mark is None or alert['updated_at'] >= high_water_mark]
+        updated_count += store.upsert_alerts(org, alert_type, changed)
+        print(f'[{alert_type}] {updated_count} new or updated alerts so far')
+        for alert in changed:
+            if new_high_water_mark is None or alert['updated_at'] > new_high_water_mark:
+                new_high_water_mark = alert['updated_at']
+
+        if len(changed) < len(page):
+            break  # Reached alerts that were already synced
+        url = response.links.get('next', {}).get('url')
+
+    store.set_high_water_mark(org, alert_type, new_high_water_mark, synced_at)
+    print(f'Synced {updated_count} new or updated {alert_type} alerts for {org} since {high_water_mark or "the beginning"}')
+    return store.get_alerts(org, alert_type)
 
 # https://docs.github.com/en/rest/dependabot/alerts?apiVersion=2022-11-28
-def get_dependabot_alerts(org, token, filename):
+def upsert_to_warehouse(rows, warehouse, org, alert_type, batch_size=1000):
+    # Passes flattened alerts through unchanged while upserting them into the warehouse
+    # tables of the alert store in batches, so the CSV stays a single streaming pass
+    seen_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    batch = []
+    for row in rows:
+        batch.append(row)
+        yield row
+        if len(batch) >= batch_size:
+            warehouse.upsert_rows(org, alert_type, batch, seen_at)
+            batch = []
+    if batch:
+        warehouse.upsert_rows(org, alert_type, batch, seen_at)
+
+def get_dependabot_alerts(org, token, filename, client, store=None, warehouse=None):
     headers = {
         'Authorization': f'token {token}',
         'Accept': 'application/vnd.github+json',
@@ -142,18 +348,20 @@ def get_dependabot_alerts(org, token, filename):
     params = {
         'per_page': 100
     }
-    alerts = []
-
-    alerts = fetch_alerts_generic(url, headers, params)
+    if store is not None:
+        alerts = sync_alerts(client, url, headers, params, store, org, 'dependabot')
+    else:
+        alerts = fetch_alerts_generic(client, url, headers, params, 'dependabot')
 
-    # Flatten each alert
-    flattened_alerts = [flatten_dict(alert) for alert in alerts]
-    
-    print(f'Dependabot alerts for {org}: {len(flattened_alerts)}')
-    write_to_csv(flattened_alerts, 'dependabot', org, filename)
+    # Flatten each alert as it arrives and stream it to the CSV
+    flattened_alerts = map(AlertFlattener().flatten, alerts)
+    if warehouse is not None:
+        flattened_alerts = upsert_to_warehouse(flattened_alerts, warehouse, org, 'dependabot')
+    count = write_alerts(flattened_alerts, 'dependabot', org, filename)
+    print(f'Dependabot alerts for {org}: {count}')
 
 # https://docs.github.com/en/rest/code-scanning/code-scanning?apiVersion=2022-11-28#list-code-scanning-alerts-for-an-organization
-def get_code_scanning_alerts(org, token, filename):
+def get_code_scanning_alerts(org, token, filename, client, store=None, warehouse=None):
     headers = {
         'Authorization': f'token {token}',
         'Accept': 'application/vnd.github+json',
@@ -163,26 +371,30 @@ def get_code_scanning_alerts(org, token, filename):
     params = {
         'per_page': 100
     }
-    alerts = []
-
-    alerts = fetch_alerts_generic(url, headers, params)
+    if store is not None:
+        alerts = sync_alerts(client, url, headers, params, store, org, 'code-scanning')
+    else:
+        alerts = fetch_alerts_generic(client, url, headers, params, 'code-scanning')
 
     # Debug: Print the JSON object for alerts
     #print(json.dumps(alerts, indent=4))
 
     # Ensure "security_severity_level" is in the "rule" dictionary for all alerts
     # This is a hack where some tools (e.g. tfsec) didn't put in the "security_severity_level" in the "rule" dictionary
-    for alert in alerts:
-        if 'rule' in alert and 'security_severity_level' not in alert['rule']:
-            alert['rule']['security_severity_level'] = 'N/A'  # or 'unknown'
-
-    flattened_alerts = [flatten_dict(alert) for alert in alerts]
+    def add_missing_security_severity(alerts):
+        for alert in alerts:
+            if 'rule' in alert and 'security_severity_level' not in alert['rule']:
+                alert['rule']['security_severity_level'] = 'N/A'  # or 'unknown'
+            yield alert
 
-    print(f'Code scanning alerts for {org}: {len(flattened_alerts)}')
-    write_to_csv(flattened_alerts, 'code-scanning', org, filename)
+    flattened_alerts = map(AlertFlattener().flatten, add_missing_security_severity(alerts))
+    if warehouse is not None:
+        flattened_alerts = upsert_to_warehouse(flattened_alerts, warehouse, org, 'code-scanning')
+    count = write_alerts(flattened_alerts, 'code-scanning', org, filename)
+    print(f'Code scanning alerts for {org}: {count}')
 
 # https://docs.github.com/en/rest/secret-scanning/secret-scanning?apiVersion=2022-11-28#list-secret-scanning-alerts-for-an-organization
-def get_secret_alerts(org, token, filename):
+def get_secret_alerts(org, token, filename, client, store=None, warehouse=None):
     headers = {
         'Authorization': f'token {token}',
         'Accept': 'application/vnd.github+json',
@@ -192,44 +404,80 @@ def get_secret_alerts(org, token, filename):
     params = {
         'per_page': 100
     }
-    alerts = []
-
-    alerts = fetch_alerts_generic(url, headers, params)
-    
-    flattened_alerts = [flatten_dict(alert) for alert in alerts]
+    if store is not None:
+        alerts = sync_alerts(client, url, headers, params, store, org, 'secret')
+    else:
+        alerts = fetch_alerts_generic(client, url, headers, params, 'secret')
     
-    print(f'Secret scanning alerts for {org}: {len(flattened_alerts)}')
-    write_to_csv(flattened_alerts, 'secret', org, filename)
+    flattened_alerts = map(AlertFlattener().flatten, alerts)
+    if warehouse is not None:
+        flattened_alerts = upsert_to_warehouse(flattened_alerts, warehouse, org, 'secret')
+    count = write_alerts(flattened_alerts, 'secret', org, filename)
+    print(f'Secret scanning alerts for {org}: {count}')
 
 def print_help():
-    print("Usage: python fetch_org_alerts.py <org> [token]")
+    print("Usage: python fetch_org_alerts.py <org> [token] [--sync] [--warehouse] [--parquet]")
     print("org: The name of the GitHub organization")
     print("token: The GitHub token (optional). If not token is supplied the 'gh' CLI will be used to get the token.")
+    print("--sync: Only fetch alerts updated since the last sync and merge them into the local alert store (_reports/alerts.db).")
+    print("--warehouse: Also upsert the alerts into the indexed warehouse tables of the local alert store (_reports/alerts.db).")
+    print("--parquet: Write typed Parquet files instead of CSV (requires pyarrow).")
 
 def main():
 
-    if len(sys.argv) < 2:
+    sync = '--sync' in sys.argv
+    warehouse = '--warehouse' in sys.argv
+    parquet = '--parquet' in sys.argv
+    positional_args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+
+    if len(positional_args) < 1:
         print_help()
         return
 
-    org = sys.argv[1]
-    token = sys.argv[2] if len(sys.argv) > 2 else get_github_token()
+    org = positional_args[0]
+    token = positional_args[1] if len(positional_args) > 1 else get_github_token()
     
     # Get the current timestamp
     timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
 
+    if parquet and not PARQUET_AVAILABLE:
+        print("--parquet needs pyarrow (pip install pyarrow). Writing CSV files instead.")
+        parquet = False
+    extension = 'parquet' if parquet else 'csv'
+
     # Generate the filenames
-    secrets_file = f'_reports/{org}_secrets_{timestamp}.csv'
-    dependencies_file = f'_reports/{org}_dependencies_{timestamp}.csv'
-    code_scanning_file = f'_reports/{org}_code_scanning_{timestamp}.csv'
+    secrets_file = f'_reports/{org}_secrets_{timestamp}.{extension}'
+    dependencies_file = f'_reports/{org}_dependencies_{timestamp}.{extension}'
+    code_scanning_file = f'_reports/{org}_code_scanning_{timestamp}.{extension}'
 
     if not token:
         print("No GitHub token provided and failed to get token via gh")
         return
 
-    get_dependabot_alerts(org, token, dependencies_file)
-    get_code_scanning_alerts(org, token, code_scanning_file)
-    get_secret_alerts(org, token, secrets_file)
+    # One client (and one rate limit budget) for all alert types.
+    # Unchanged alert pages are answered with 304 Not Modified from the on-disk cache.
+    # Secret scanning pages hold plaintext secrets and are never cached (see response_cache.py).
+    # The pool holds a connection for every page that can be in flight across the three streams.
+    client = GitHubClient(pool_size=3 * MAX_PARALLEL_PAGES, cache=ResponseCache('.ghas_cache'))
+
+    # In sync mode only changed alerts are fetched; the CSVs are written from the local store.
+    # With --warehouse the flattened alerts are also upserted into the store's warehouse tables.
+    store = AlertStore('_reports/alerts.db') if sync or warehouse else None
+    sync_store = store if sync else None
+    warehouse_store = store if warehouse else None
+
+    # The three alert streams are independent, so fetch them at the same time.
+    # They share one client, so they also share one rate limit budget.
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(get_dependabot_alerts, org, token, dependencies_file, client, sync_store, warehouse_store),
+            executor.submit(get_code_scanning_alerts, org, token, code_scanning_file, client, sync_store, warehouse_store),
+            executor.submit(get_secret_alerts, org, token, secrets_file, client, sync_store, warehouse_store)
+        ]
+        for future in futures:
+            future.result()  # Re-raise any error from the worker threads
+    client.rate_limiter.print_quota()
+    client.cache.print_summary()
 
     # In your main function:
     generate_report(org, secrets_file, dependencies_file, code_scanning_file)
@@ -0,0 +1,38 @@
+import importlib.util
+import os
+
+import pandas as pd
+import pytest
+
+# fetch-org-alerts.py is a script with a hyphenated name, so it is loaded from its path
+spec = importlib.util.spec_from_file_location('fetch_org_alerts', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fetch-org-alerts.py'))
+fetch_org_alerts = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fetch_org_alerts)
+
+from parquet_export import write_parquet
+from report_loader import load_report
+
+COLUMNS = ['state', 'created_at', 'html_url', 'repository_full_name', 'rule_security_severity_level', 'rule_severity']
+
+def test_sla_falls_back_to_rule_severity_for_parquet_code_scanning_report(tmp_path):
+    pytest.importorskip('pyarrow')
+    # get_code_scanning_alerts writes 'N/A' for tools without a security severity (e.g. tfsec)
+    rows = [
+        {'state': 'open', 'created_at': '2024-01-01T00:00:00Z', 'html_url': 'https://github.com/o/r/security/code-scanning/1',
+         'repository_full_name': 'o/r', 'rule_security_severity_level': 'high', 'rule_severity': 'error'},
+        {'state': 'open', 'created_at': '2024-01-01T00:00:00Z', 'html_url': 'https://github.com/o/r/security/code-scanning/2',
+         'repository_full_name': 'o/r', 'rule_security_severity_level': 'N/A', 'rule_severity': 'error'},
+        {'state': 'open', 'created_at': '2024-01-01T00:00:00Z', 'html_url': 'https://github.com/o/r/security/code-scanning/3',
+         'repository_full_name': 'o/r', 'rule_security_severity_level': 'N/A', 'rule_severity': 'note'},
+        {'state': 'open', 'created_at': '2024-01-01T00:00:00Z', 'html_url': 'https://github.com/o/r/security/code-scanning/4',
+         'repository_full_name': 'o/r', 'rule_security_severity_level': '', 'rule_severity': 'warning'},
+    ]
+    filename = str(tmp_path / 'org_code_scanning.parquet')
+    write_parquet(rows, COLUMNS, filename)
+    df = load_report(filename, 'code_scanning')
+    assert 'N/A' in df['rule_security_severity_level'].astype('string').tolist()
+
+    df = fetch_org_alerts.add_sla_columns(df, 'code_scanning', pd.Timestamp('2024-02-15T00:00:00Z'))
+
+    assert df['sla_days'].tolist() == [30, 30, 180, 90]
+    assert df['sla_breached'].tolist() == [True, True, False, False]
@@ -1,174 +1,173 @@
-import requests
+import os
+import sys
+import argparse
 import csv
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# Shared alert CSV schemas live in the top-level common directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+from alert_schema import get_csv_headers, to_schema_row
+from alert_flattener import AlertFlattener
+from alert_store import AlertStore, ADVISORY_FIELDS
+from github_client import GitHubClient
 
 # Configuration
 GITHUB_TOKEN = 'YOUR_GITHUB_TOKEN'
+# Repository used when no repos or owners are given on the command line
 REPO_OWNER = 'austimkelly'
 REPO_NAME = 'swiss-cheese'
 HEADERS = {
     'Authorization': f'token {GITHUB_TOKEN}',
     'Accept': 'application/vnd.github.v3+json',
 }
+# With --warehouse, alerts are also upserted into this SQLite alert warehouse (see common/alert_store.py),
+# so history accumulates across runs even though the CSVs are overwritten
+WAREHOUSE_PATH = 'alerts.db'
+# Number of repositories fetched at the same time
+MAX_WORKERS = 8
+
+# Every output row starts with the repository it belongs to, so one file can hold many repos
+REPO_IDENTITY_FIELDS = ['repository_owner_login', 'repository_name', 'repository_full_name']
+
+# Output file and repository endpoint of each result type, in the order they are reported
+RESULT_TYPES = {
+    'secret': ('secret_scanning_results.csv', 'secret-scanning/alerts', 'Secret scanning results'),
+    'code-scanning': ('code_scanning_results.csv', 'code-scanning/alerts', 'Code scanning results'),
+    'dependabot': ('dependabot_alerts.csv', 'dependabot/alerts', 'Dependabot alerts'),
+    'advisory': ('advisories.csv', 'security-advisories', 'Security advisories'),
+}
 
-# This function is used to flatten a nested dictionary. 
-# The arguments are a dictionary to flatten (dd), a separator for the keys (separator), and a prefix for the keys (prefix).
-def flatten_dict(dd, separator='_', prefix=''):
-    # The function returns a dictionary comprehension.
-    # If dd is a dictionary, it will iterate over its items.
-    return { 
-        # For each item, it checks if a prefix exists. If it does, it concatenates the prefix, separator, and key.
-        # If no prefix exists, it simply uses the key.
-        f"{prefix}{separator}{k}" if prefix else k : v
-        # This is the start of the dictionary comprehension. It iterates over the items in dd.
-        for kk, vv in dd.items()
-        # For each item, it calls flatten_dict recursively on the value and iterates over the items in the resulting dictionary.
-        # It uses the key from dd as the prefix for this recursive call.
-        for k, v in flatten_dict(vv, separator, kk).items()
-    # If dd is not a dictionary, it simply returns a dictionary with a single item. The key is the prefix and the value is dd.
-    } if isinstance(dd, dict) else { prefix : dd }
-
-
-def parse_advisory_results_to_csv(advisories):
-    # Define the CSV file
-    with open('advisories.csv', 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        # Write the header
-        writer.writerow(["ghsa_id", "cve_id", "url", "html_url", "summary", "description", "severity", "author", "publisher", "state", "created_at", "updated_at", "published_at"])
-        # Write the data
-        for advisory in advisories:
-            writer.writerow([advisory['ghsa_id'], advisory['cve_id'], advisory['url'], advisory['html_url'], advisory['summary'], advisory['description'], advisory['severity'], advisory['author']['login'], advisory['publisher']['login'], advisory['state'], advisory['created_at'], advisory['updated_at'], advisory['published_at']])
-    
-    print("Security advisories have been written to advisories.csv")
-
-def parse_dependabot_alerts_to_csv(dependabot_alerts):
-    # Define the CSV file
-    csv_file = "dependabot_alerts.csv"
-
-    # Flatten the alerts
-    flattened_alerts = [flatten_dict(alert) for alert in dependabot_alerts]
-
-    # Define the CSV headers based on the keys of all alerts
-    csv_headers = set(key for alert in flattened_alerts for key in alert.keys())
-
-    # Write the alerts to the CSV file
-    with open(csv_file, 'w', newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=csv_headers)
-        writer.writeheader()
-        for alert in flattened_alerts:
-            writer.writerow(alert)
-
-    print(f"Dependabot alerts have been written to {csv_file}")
-
-def parse_code_scanning_results_to_csv(code_scanning_results):
-    # Define the CSV file
-    csv_file = "code_scanning_results.csv"
-
-    # Flatten the results
-    flattened_results = [flatten_dict(result) for result in code_scanning_results]
-
-    # Define the CSV headers based on the keys of all results
-    csv_headers = set(key for result in flattened_results for key in result.keys())
-
-    # Write the results to the CSV file
-    with open(csv_file, 'w', newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=csv_headers)
-        writer.writeheader()
-        for result in flattened_results:
-            writer.writerow(result)
-
-    print(f"Code scanning results have been written to {csv_file}")
-
-def parse_secret_scanning_results_to_csv(secret_scanning_results):
-    # Define the CSV file
-    csv_file = "secret_scanning_results.csv"
-
-    # Define the CSV headers based on the keys of the first result
-    csv_headers = secret_scanning_results[0].keys()
-
-    # Write the results to the CSV file
-    with open(csv_file, 'w', newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=csv_headers)
-        writer.writeheader()
-        for result in secret_scanning_results:
-            writer.writerow(result)
-
-    print(f"Secret scanning results have been written to {csv_file}")
-
+def get_csv_fields(result_type):
+    if result_type == 'advisory':
+        return REPO_IDENTITY_FIELDS + ADVISORY_FIELDS
+    return REPO_IDENTITY_FIELDS + get_csv_headers(result_type, include_repository=False)
+
+# Turns one API result into its output row (without the repository identity columns)
+def to_row(result_type, result, flattener):
+    if result_type == 'advisory':
+        row = {field: result.get(field) for field in ADVISORY_FIELDS}
+        row['author'] = (result.get('author') or {}).get('login')
+        row['publisher'] = (result.get('publisher') or {}).get('login')
+        return row
+    # Nested objects (e.g. resolved_by) are flattened onto their declared *_login, ... columns
+    return flattener.flatten(result)
+
+# Fetches every page of a repository list endpoint. Returns None if the endpoint is not
+# available for the repo (e.g. the feature is not enabled).
 # For Secrets scanning REST API, see: https://docs.github.com/en/rest/secret-scanning/secret-scanning?apiVersion=2022-11-28
-# For repo-level secret scanning alerts, see: https://docs.github.com/en/rest/secret-scanning/secret-scanning?apiVersion=2022-11-28#list-secret-scanning-alerts-for-a-repository
-def get_secret_scanning_alerts():
-    url = f'https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/secret-scanning/alerts'
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200 and response.text.strip():
-        return response.json()
-    else:
-        print(f"Error in get_secret_scanning_alerts: Received status code {response.status_code} with response: {response.text}")
-        return None
-
 # For Code scanning alerts REST API, see: https://docs.github.com/en/rest/code-scanning/code-scanning?apiVersion=2022-11-28
-# For Code scanning alerts for a repo, see: https://docs.github.com/en/rest/code-scanning/code-scanning?apiVersion=2022-11-28#list-code-scanning-alerts-for-a-repository
-def get_code_scanning_alerts():
-    url = f'https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/code-scanning/alerts'
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200 and response.text.strip():
-        return response.json()
-    else:
-        print(f"Error in get_code_scanning_alerts: Received status code {response.status_code} with response: {response.text}")
-        return None
-
 # For Dependabot alerts REST API, see: https://docs.github.com/en/rest/dependabot/alerts?apiVersion=2022-11-28
-# For Dependabot alerts on a repo, see: https://docs.github.com/en/rest/dependabot/alerts?apiVersion=2022-11-28#list-dependabot-alerts-for-a-repository
-def get_dependabot_alerts():
-    # Dependabot alerts can be obtained from the repository vulnerability alerts
-    url = f'https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/dependabot/alerts'
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200 and response.text.strip():
-        return response.json()
-    else:
-        print(f"Error in get_dependabot_alerts: Received status code {response.status_code} with response: {response.text}")
-        return None
-
-def get_security_advisories():
-    url = f'https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/security-advisories'
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200 and response.text.strip():
-        return response.json()
-    else:
-        print(f"Error in get_security_advisories: Received status code {response.status_code} with response: {response.text}")
-        return None
+# For repository security advisories, see: https://docs.github.com/en/rest/security-advisories/repository-advisories?apiVersion=2022-11-28
+def get_all_pages(client, url, result_type, full_name):
+    results = []
+    for response in client.get_pages(url, {'per_page': 100}):
+        if response.status_code != 200 or not response.text.strip():
+            print(f"Error fetching {result_type} results for {full_name}: Received status code {response.status_code} with response: {response.text}")
+            return None
+        results.extend(response.json())
+    return results
+
+# Fetches all four result types of one repository. Returns {result_type: rows or None}.
+def get_repo_results(client, owner, name):
+    full_name = f'{owner}/{name}'
+    identity = {'repository_owner_login': owner, 'repository_name': name, 'repository_full_name': full_name}
+    flattener = AlertFlattener()
+    repo_results = {}
+    for result_type, (_, endpoint, _) in RESULT_TYPES.items():
+        results = get_all_pages(client, f'https://api.github.com/repos/{full_name}/{endpoint}', result_type, full_name)
+        if results is None:
+            repo_results[result_type] = None
+        else:
+            repo_results[result_type] = [dict(identity, **to_row(result_type, result, flattener)) for result in results]
+    return repo_results
+
+# Lists the repositories of an organization, or of a user if the owner is not an organization
+def get_owner_repos(client, owner):
+    for url in [f'https://api.github.com/orgs/{owner}/repos', f'https://api.github.com/users/{owner}/repos']:
+        repos = []
+        for response in client.get_pages(url, {'per_page': 100}):
+            if response.status_code == 200:
+                repos.extend((repo['owner']['login'], repo['name']) for repo in response.json())
+        if response.status_code == 200:
+            print(f"Number of repos found for {owner}: {len(repos)}")
+            return repos
+    print(f"Failed to list repositories for {owner}: Received status code {response.status_code} with response: {response.text}")
+    return []
+
+def save_to_warehouse(store, result_type, owner, rows):
+    seen_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return store.upsert_rows(owner, result_type, rows, seen_at)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Fetch the security alerts and advisories of one or more repositories into shared CSV files.')
+    parser.add_argument('repos', nargs='*', help=f'Repositories as owner/name. Defaults to {REPO_OWNER}/{REPO_NAME} when no --owner is given.')
+    parser.add_argument('--owner', action='append', default=[], help='Fetch every repository of this organization or user. Can be repeated.')
+    parser.add_argument('--token', default=os.environ.get('GITHUB_TOKEN'), help='GitHub token. Defaults to $GITHUB_TOKEN, then GITHUB_TOKEN in the script.')
+    parser.add_argument('--warehouse', nargs='?', const=WAREHOUSE_PATH, default=None, help=f'Also upsert every result into a SQLite alert warehouse (default path: {WAREHOUSE_PATH}).')
+    parser.add_argument('--max-workers', type=int, default=MAX_WORKERS, help='Number of repositories fetched at the same time.')
+    return parser.parse_args()
 
 def main():
-    secret_alerts = get_secret_scanning_alerts()
-    code_alerts = get_code_scanning_alerts()
-    dependabot_alerts = get_dependabot_alerts()
-
-    print("Secret Scanning Alerts:")
-    if secret_alerts is None:
-        print("No data available")
-    else:
-        #print(secret_alerts)
-        parse_secret_scanning_results_to_csv(secret_alerts)
-
-    print("\nCode Scanning Alerts:")
-    if code_alerts is None:
-        print("No data available")
-    else:
-        #print(code_alerts)
-        parse_code_scanning_results_to_csv(code_alerts)
-
-    print("\nDependabot Alerts:")
-    if dependabot_alerts is None:
-        print("No data available")
-    else:
-        #print(dependabot_alerts)
-        parse_dependabot_alerts_to_csv(dependabot_alerts)
-
-    print("\nSecurity Advisories:")
-    security_advisories = get_security_advisories()
-    if security_advisories is None:
-        print("No data available")
-    else:
-        parse_advisory_results_to_csv(security_advisories)
+    args = parse_args()
+    headers = dict(HEADERS)
+    if args.token:
+        headers['Authorization'] = f'token {args.token}'
+    # One pooled client, with retries and rate limit pacing, shared by all worker threads
+    client = GitHubClient(headers=headers, pool_size=args.max_workers)
+
+    repos = []
+    for repo in args.repos:
+        owner, _, name = repo.partition('/')
+        if not name:
+            sys.exit(f"Invalid repository '{repo}'. Use owner/name.")
+        repos.append((owner, name))
+    for owner in args.owner:
+        repos.extend(get_owner_repos(client, owner))
+    if not args.repos and not args.owner:
+        repos.append((REPO_OWNER, REPO_NAME))
+    repos = list(dict.fromkeys(repos))  # Drop duplicates, keep order
+    print(f"Fetching security results for {len(repos)} repositories with {args.max_workers} workers")
+
+    store = AlertStore(args.warehouse) if args.warehouse else None
+    files = {}
+    writers = {}
+    counts = dict.fromkeys(RESULT_TYPES, 0)
+    try:
+        for result_type, (csv_file, _, _) in RESULT_TYPES.items():
+            files[result_type] = open(csv_file, 'w', newline='')
+            writers[result_type] = csv.DictWriter(files[result_type], fieldnames=get_csv_fields(result_type))
+            writers[result_type].writeheader()
+        known_headers = {result_type: set(get_csv_fields(result_type)) for result_type in RESULT_TYPES}
+
+        # Repos are fetched concurrently; each repo's rows are appended to the shared files as soon
+        # as it and the repos before it are done, so the files keep the order of the repo list
+        with ThreadPoolExecutor(max_workers=args.max_workers) as executor:
+            repo_results = executor.map(lambda repo: get_repo_results(client, *repo), repos)
+            for (owner, name), results in zip(repos, repo_results):
+                summary = []
+                for result_type, rows in results.items():
+                    if rows is None:
+                        summary.append(f"{result_type}: no data available")
+                        continue
+                    for row in rows:
+                        writers[result_type].writerow(to_schema_row(row, known_headers[result_type]))
+                    if store is not None and rows:
+                        save_to_warehouse(store, result_type, owner, rows)
+                    counts[result_type] += len(rows)
+                    summary.append(f"{result_type}: {len(rows)}")
+                print(f"{owner}/{name}: {', '.join(summary)}")
+    finally:
+        for csvfile in files.values():
+            csvfile.close()
+        if store is not None:
+            store.close()
+
+    for result_type, (csv_file, _, description) in RESULT_TYPES.items():
+        print(f"{description} ({counts[result_type]}) have been written to {csv_file}")
+    if store is not None:
+        print(f"All results have been saved to {args.warehouse}")
+    client.rate_limiter.print_quota()
 
 if __name__ == "__main__":
     main()
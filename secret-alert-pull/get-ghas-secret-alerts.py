@@ -1,6 +1,11 @@
 import os
-import requests
+import sys
 import csv
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared GitHub HTTP client lives in the top-level common directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+from github_client import GitHubClient
 
 # Get the personal access token from the GH_TOKEN environment variable
 token = os.getenv('GITHUB_ACCESS_TOKEN')
@@ -11,26 +16,92 @@ account_type = 'users'  # 'orgs' or 'users'
 # Replace with your account name
 owners = ['austimkelly']  # The org or user names housing the repositories
 verbose_logging = True
+# Number of repositories fetched at the same time when the org endpoint is not available
+max_workers = 8
 
-def fetch_repos(account_type, account, headers, page=1, per_page=100):
+def fetch_repos(account_type, account, client, per_page=100):
     repos = []
-    while True:
-        repos_url = f'https://api.github.com/{account_type}/{account}/repos?page={page}&per_page={per_page}'
-        if verbose_logging:
-            print(f"Calling {repos_url}...")
-        response = requests.get(repos_url, headers=headers)
-        data = response.json()
-        repos.extend(data)
-        if len(data) < per_page:
+    for response in client.get_pages(f'https://api.github.com/{account_type}/{account}/repos', {'per_page': per_page}):
+        if response.status_code != 200:
+            print(f"Failed to list repositories for {account}: {response.status_code} {response.text}")
             break
-        page += 1
+        repos.extend(response.json())
     return repos
 
+def to_row(owner, repo_name, alert):
+    return {
+        'owner': owner,  # org or user
+        'repo': repo_name,
+        'number': alert['number'],
+        'rule': alert['secret_type'],  # Use 'secret_type' instead of 'rule'
+        'state': alert['state'],
+        'created_at': alert['created_at'],
+        'html_url': alert['html_url'],
+    }
+
+def write_org_alerts(org, client, writer):
+    # Writes every secret scanning alert of the org from the org endpoint, one page at a time.
+    # Returns the number of alerts written, or None if the org endpoint is not available
+    # (e.g. the owner is a user, or the token lacks org-level access). A failure after the first
+    # page exits the script, because the CSV would otherwise be silently incomplete.
+    # See: https://docs.github.com/en/rest/secret-scanning/secret-scanning?apiVersion=2022-11-28#list-secret-scanning-alerts-for-an-organization
+    count = 0
+    for response in client.get_pages(f'https://api.github.com/orgs/{org}/secret-scanning/alerts', {'per_page': 100}):
+        if verbose_logging:
+            print(f"Fetched {response.url}")
+        if response.status_code != 200:
+            if count:
+                print(f"Error: Failed to read org alerts for {org} after {count} alerts: {response.status_code} {response.text}", file=sys.stderr)
+                print("secret_scanning_alerts.csv is incomplete. Run the script again.", file=sys.stderr)
+                sys.exit(1)
+            print(f"Org secret scanning alerts are not available for {org} ({response.status_code}). Fetching each repository instead.")
+            return None
+        for alert in response.json():
+            writer.writerow(to_row(org, alert['repository']['name'], alert))
+            count += 1
+        if verbose_logging:
+            print(f"{org}: {count} alerts so far")
+    return count
+
+def fetch_repo_alerts(owner, repo_name, client):
+    # All pages of one repository's alerts, or None if they are not available
+    # (e.g. secret scanning is disabled or the repository is archived)
+    alerts = []
+    for response in client.get_pages(f'https://api.github.com/repos/{owner}/{repo_name}/secret-scanning/alerts', {'per_page': 100}):
+        if verbose_logging:
+            print(f"Fetched {response.url}")
+        if response.status_code != 200:
+            print(f"Skipping {repo_name}: {response.status_code} {response.text}")
+            return None
+        alerts.extend(response.json())
+    return alerts
+
+def write_repo_alerts(owner, client, writer):
+    # Fetches the repositories' alerts concurrently and writes each repository's rows as soon as
+    # it and the ones before it are done, so the CSV keeps the order of the repository listing
+    repos = fetch_repos(account_type, owner, client)
+    count = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda repo: fetch_repo_alerts(owner, repo['name'], client), repos)
+        for repo, alerts in zip(repos, results):
+            if alerts is None:
+                continue
+            for alert in alerts:
+                writer.writerow(to_row(owner, repo['name'], alert))
+            count += len(alerts)
+            if verbose_logging:
+                print(f"{owner}/{repo['name']}: {len(alerts)} alerts")
+    return count
+
 headers = {
     'Authorization': f'token {token}',
     'Accept': 'application/vnd.github.v3+json',
 }
 
+# The client paces requests against the rate limit and retries rate-limited calls.
+# Its connection pool holds one connection per worker thread.
+client = GitHubClient(headers=headers, pool_size=max_workers)
+
 # Open the CSV file
 with open('secret_scanning_alerts.csv', 'w', newline='') as csvfile:
     fieldnames = ['owner', 'repo', 'number', 'rule', 'state', 'created_at', 'html_url']
@@ -38,30 +109,10 @@ with open('secret_scanning_alerts.csv', 'w', newline='') as csvfile:
 
     writer.writeheader()
     for owner in owners:
-            repos = fetch_repos(account_type, owner, headers)
-            # For each repo, get the secret scanning alerts
-            for repo in repos:
-                alerts_response = requests.get(f'https://api.github.com/repos/{owner}/{repo["name"]}/secret-scanning/alerts', headers=headers)
-                alerts = alerts_response.json()
-
-                # print alerts json response for each repo
-                if verbose_logging:
-                    print(f"Calling https://api.github.com/repos/{owner}/{repo['name']}/secret-scanning/alerts...")
-                    print(alerts)
-
-                # If the response is a dictionary with a 'message' key, skip this iteration
-                if isinstance(alerts, dict) and 'message' in alerts:
-                    print(f"Skipping {repo['name']}: {alerts['message']}")
-                    continue
+        # One paginated org-wide listing is far fewer requests than one call per repository
+        count = write_org_alerts(owner, client, writer) if account_type == 'orgs' else None
+        if count is None:
+            count = write_repo_alerts(owner, client, writer)
+        print(f"Secret scanning alerts for {owner}: {count}")
 
-                # Write each alert to the CSV file
-                for alert in alerts:
-                    writer.writerow({
-                        'owner': owner,  # org or user
-                        'repo': repo['name'],
-                        'number': alert['number'],
-                        'rule': alert['secret_type'],  # Use 'secret_type' instead of 'rule'
-                        'state': alert['state'],
-                        'created_at': alert['created_at'],
-                        'html_url': alert['html_url'],
-                    })
\ No newline at end of file
+client.rate_limiter.print_quota()
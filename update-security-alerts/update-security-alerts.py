@@ -1,38 +1,98 @@
-import requests
+import os
+import sys
+import csv
+import json
 import argparse
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared GitHub HTTP client lives in the top-level common directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+from github_client import GitHubClient
 
 # Parse command line arguments
-parser = argparse.ArgumentParser(description='Update a security alert in a GitHub repository.')
-parser.add_argument("--repo", required=True, help="The GitHub repository to update security alerts for, in the format 'owner/repo'.")
+parser = argparse.ArgumentParser(description='Update a security alert in a GitHub repository, or a batch of alerts from a CSV/JSON file.')
+parser.add_argument("--repo", help="The GitHub repository to update security alerts for, in the format 'owner/repo'. Required unless --batch is used.")
 parser.add_argument("--gh_token", required=True, help="The GitHub token used for authentication. Should have write security_event permissions.")
-parser.add_argument("--alert_type", required=True, choices=["dependabot", "code-scanning", "secret-scanning"], help="The type of the security alert. Can be 'dependabot', 'code-scanning', or 'secret-scanning'.")
-parser.add_argument("--state", required=True, help="The state of the security alert. For 'dependabot' and 'code-scanning' alerts, can be 'open' or 'dismissed'. For 'secret-scanning' alerts, can be 'open' or 'resolved'.")
+parser.add_argument("--alert_type", choices=["dependabot", "code-scanning", "secret-scanning"], help="The type of the security alert. Can be 'dependabot', 'code-scanning', or 'secret-scanning'. With --batch, the default for rows without an alert_type column.")
+parser.add_argument("--state", help="The state of the security alert. For 'dependabot' and 'code-scanning' alerts, can be 'open' or 'dismissed'. For 'secret-scanning' alerts, can be 'open' or 'resolved'. Required unless --batch is used.")
 parser.add_argument("--dismissed_reason", help="The reason for dismissing the security alert. Required when '--state' is 'dismissed' for 'dependabot' and 'code-scanning' alerts, and when '--state' is 'resolved' for 'secret-scanning' alerts.")
 parser.add_argument("--dismissed_comment", help="An optional comment about the dismissal of the security alert.")
-parser.add_argument("--alert_number", required=True, help="The number of the security alert to update.")
+parser.add_argument("--alert_number", help="The number of the security alert to update. Required unless --batch is used.")
+parser.add_argument("--batch", help="A .csv or .json file of alerts to update, one per row (repo, alert_type, number, state, reason, comment). fetch-org-alerts.py reports need a target_state column.")
+parser.add_argument("--dry_run", action="store_true", help="With --batch, validate the rows and write the results file without updating any alert.")
+parser.add_argument("--max_workers", type=int, default=4, help="With --batch, the number of updates sent at the same time.")
+parser.add_argument("--retries", type=int, default=3, help="Number of retries for updates that fail with a server error.")
+parser.add_argument("--results", help="With --batch or --snapshot, where to write the result of each row. Defaults to <input file>.results.csv.")
+parser.add_argument("--snapshot", help="A report written by fetch-org-alerts.py (.csv or .parquet). Every alert matching the filters below is set to --state, with --dismissed_reason and --dismissed_comment.")
+parser.add_argument("--rule_id", help="With --snapshot, only alerts of this code scanning rule (glob patterns allowed).")
+parser.add_argument("--tool_name", help="With --snapshot, only alerts of this code scanning tool (glob patterns allowed).")
+parser.add_argument("--manifest_path", help="With --snapshot, only Dependabot alerts of this manifest path (glob patterns allowed), e.g. '*/package-lock.json'.")
+parser.add_argument("--repo_glob", help="With --snapshot, only alerts of repositories matching this 'owner/repo' glob, e.g. 'my-org/legacy-*'.")
+parser.add_argument("--older_than_days", type=float, help="With --snapshot, only alerts created more than this many days ago.")
+parser.add_argument("--where", help="With --snapshot, an extra pandas query expression over the report columns, e.g. \"rule_severity == 'note'\".")
 args = parser.parse_args()
 
 dependabot_reasons = ["fix_started", "inaccurate", "no_bandwidth", "not_used", "tolerable_risk"]
 code_reasons = ["null", "false positive", "won't fix", "used in tests"]
 secret_reasons = ["false_positive", "won't fix", "revoked", "used_in_tests", "null"]
 
-if args.state == "dismissed":
-    if args.dismissed_reason is None:
-        parser.error("--dismissed_reason is required when --state is 'dismissed'")
-    elif args.alert_type == "dependabot" and args.dismissed_reason not in dependabot_reasons:
-        parser.error("Invalid --dismissed_reason for dependabot. Choices are: " + ", ".join(dependabot_reasons))
-    elif args.alert_type == "code-scanning" and args.dismissed_reason not in code_reasons:
-        parser.error("Invalid --dismissed_reason for code. Choices are: " + ", ".join(code_reasons))
+# Alert type names used by the fetch scripts, mapped to the names used here
+ALERT_TYPE_ALIASES = {"secret": "secret-scanning", "secrets": "secret-scanning", "code_scanning": "code-scanning", "dependencies": "dependabot"}
+
+# Batch columns and the other columns they can also be read from. In a fetch-org-alerts.py
+# report, state, dismissed_reason and the comments are the alerts' current values, so the
+# targets must be given in target_* columns; the report's state is then the current state.
+BATCH_COLUMNS = {
+    "repo": ["repo", "repository_full_name"],
+    "alert_type": ["alert_type"],
+    "number": ["number", "alert_number"],
+    "state": ["target_state", "state"],
+    "reason": ["target_reason", "reason"],
+    "comment": ["target_comment", "comment"],
+}
+RESULTS_FIELDS = list(BATCH_COLUMNS) + ["result", "status_code", "message"]
+
+# Returns the validation error of an update, or None if it is valid.
+# check_state also rejects states other than open/dismissed for dependabot and code scanning;
+# single updates leave that to the API, as they always have.
+def validate_update(alert_type, state, reason, check_state=True):
+    if state == "dismissed":
+        if reason is None:
+            return "--dismissed_reason is required when --state is 'dismissed'"
+        elif alert_type == "dependabot" and reason not in dependabot_reasons:
+            return "Invalid --dismissed_reason for dependabot. Choices are: " + ", ".join(dependabot_reasons)
+        elif alert_type == "code-scanning" and reason not in code_reasons:
+            return "Invalid --dismissed_reason for code. Choices are: " + ", ".join(code_reasons)
+
+    if alert_type == "secret-scanning":
+        if state not in ["open", "resolved"]:
+            return "Invalid --state for secret-scanning. Choices are: open, resolved"
+        if state == "resolved":
+            if reason is None:
+                return "--dismissed_reason is required when --alert_type is 'secret-scanning' and --state is 'resolved'"
+            elif reason not in secret_reasons:
+                return "Invalid --dismissed_reason for secret-scanning. Choices are: " + ", ".join(secret_reasons)
+    elif check_state and state not in ["open", "dismissed"]:
+        return f"Invalid --state for {alert_type}. Choices are: open, dismissed"
+    return None
+
+# Builds the request body of an update
+def build_update(alert_type, state, reason, comment):
+    data = {
+        "state": state,
+    }
 
-if args.alert_type == "secret-scanning":
-    if args.state not in ["open", "resolved"]:
-        parser.error("Invalid --state for secret-scanning. Choices are: open, resolved")
-    if args.state == "resolved":
-        if args.dismissed_reason is None:
-            parser.error("--dismissed_reason is required when --alert_type is 'secret-scanning' and --state is 'resolved'")
-        elif args.dismissed_reason not in secret_reasons:
-            parser.error("Invalid --dismissed_reason for secret-scanning. Choices are: " + ", ".join(secret_reasons))
+    if state == "dismissed":
+        data["dismissed_reason"] = reason
+        if comment is not None:
+            data["dismissed_comment"] = comment
 
+    if alert_type == "secret-scanning" and state == "resolved":
+        data["resolution"] = reason
+        if comment is not None:
+            data["resolution_comment"] = comment
+    return data
 
 # Update a secret scanning alert
 # API Endpoint: https://docs.github.com/en/rest/secret-scanning/secret-scanning?apiVersion=2022-11-28
@@ -40,7 +100,135 @@ if args.alert_type == "secret-scanning":
 # API Endpoint: https://docs.github.com/en/rest/dependabot/alerts?apiVersion=2022-11-28#update-a-dependabot-alert
 # Update a code scanning alert
 # API Endpoint: https://docs.github.com/en/rest/code-scanning/code-scanning?apiVersion=2022-11-28#update-a-code-scanning-alert
-url = f"https://api.github.com/repos/{args.repo}/{args.alert_type}/alerts/{args.alert_number}"
+def update_alert(client, repo, alert_type, alert_number, data):
+    url = f"https://api.github.com/repos/{repo}/{alert_type}/alerts/{alert_number}"
+    return client.patch(url, json=data)
+
+# Reads the rows of a batch file into dicts with the BATCH_COLUMNS keys.
+# Empty cells are None, so an empty reason or comment is left out of the update.
+def read_batch(filename):
+    if filename.endswith('.json'):
+        with open(filename) as jsonfile:
+            records = json.load(jsonfile)
+    else:
+        with open(filename, newline='') as csvfile:
+            records = list(csv.DictReader(csvfile))
+
+    rows = []
+    for record in records:
+        row = {}
+        for column, sources in BATCH_COLUMNS.items():
+            value = next((record[source] for source in sources if record.get(source) not in (None, '')), None)
+            row[column] = str(value) if value is not None else None
+        # A results file can be used as the next batch; rows that were already updated are skipped
+        row["previous_result"] = record.get("result")
+        if record.get("target_state") not in (None, ''):
+            row["current_state"] = record.get("state")
+        elif "repository_full_name" in record and "repo" not in record:
+            # A fetch-org-alerts.py report without targets; its state column is the current state
+            row["current_state"] = record.get("state")
+            row["state"] = None
+        else:
+            row["current_state"] = None
+        rows.append(row)
+    return rows
+
+def process_batch_row(client, row, dry_run):
+    alert_type = ALERT_TYPE_ALIASES.get(row["alert_type"] or args.alert_type, row["alert_type"] or args.alert_type)
+    row = dict(row, alert_type=alert_type)
+    result = {field: row.get(field) for field in RESULTS_FIELDS}
+
+    if row["previous_result"] in ["updated", "skipped"]:
+        return dict(result, result=row["previous_result"], message="Already done in a previous run")
+    if not row["repo"] or not row["number"] or not row["state"]:
+        return dict(result, result="invalid", message="repo, number and state (or target_state, for fetch-org-alerts.py reports) are required")
+    if row.get("current_state") == row["state"]:
+        return dict(result, result="skipped", message=f"Already {row['state']}")
+    if alert_type not in ["dependabot", "code-scanning", "secret-scanning"]:
+        return dict(result, result="invalid", message=f"Invalid alert_type '{alert_type}'")
+    error = validate_update(alert_type, row["state"], row["reason"])
+    if error:
+        return dict(result, result="invalid", message=error)
+    if dry_run:
+        return dict(result, result="dry-run", message=json.dumps(build_update(alert_type, row["state"], row["reason"], row["comment"])))
+
+    response = update_alert(client, row["repo"], alert_type, row["number"], build_update(alert_type, row["state"], row["reason"], row["comment"]))
+    if response.status_code == 200:
+        return dict(result, result="updated", status_code=200)
+    return dict(result, result="failed", status_code=response.status_code, message=response.text)
+
+# Snapshot columns used by the filters, and the alert type of each fetch-org-alerts.py report
+SNAPSHOT_FILTER_COLUMNS = {"rule_id": "rule_id", "tool_name": "tool_name", "manifest_path": "dependency_manifest_path", "repo_glob": "repository_full_name"}
+SNAPSHOT_ALERT_TYPES = {"_code_scanning_": "code-scanning", "_dependencies_": "dependabot", "_secrets_": "secret-scanning"}
+
+# Resolves the alerts of a fetch-org-alerts.py report that match the snapshot filters, with one
+# vectorized pass over the report, and returns them as batch rows that set them to --state.
+def select_snapshot_alerts(filename):
+    # pandas is only needed for --snapshot
+    import pandas as pd
+
+    alert_type = args.alert_type or next((alert_type for marker, alert_type in SNAPSHOT_ALERT_TYPES.items() if marker in os.path.basename(filename)), None)
+    if alert_type is None:
+        parser.error(f"Cannot tell the alert type of {filename}; pass --alert_type")
+    # Every matched alert gets the same update, so check it once instead of once per alert
+    error = validate_update(alert_type, args.state, args.dismissed_reason)
+    if error:
+        parser.error(error)
+
+    # Without --where only the columns the filters use are read
+    columns = {"repository_full_name", "number", "state", "created_at"} | set(SNAPSHOT_FILTER_COLUMNS.values())
+    if filename.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        file_columns = pq.read_schema(filename).names
+        df = pd.read_parquet(filename, columns=None if args.where else [column for column in file_columns if column in columns])
+    else:
+        df = pd.read_csv(filename, on_bad_lines='skip', usecols=None if args.where else (lambda column: column in columns))
+    print(f"Read {len(df)} alerts from {filename}")
+
+    # Alerts already in the requested state need no update
+    mask = df["state"] != args.state
+    for option, column in SNAPSHOT_FILTER_COLUMNS.items():
+        pattern = getattr(args, option)
+        if pattern is None:
+            continue
+        if column not in df.columns:
+            parser.error(f"--{option} needs the '{column}' column, which {filename} does not have")
+        mask &= df[column].astype("string").str.fullmatch(fnmatch.translate(pattern)).fillna(False).astype(bool)
+    if args.older_than_days is not None:
+        created_at = pd.to_datetime(df["created_at"], utc=True)
+        mask &= created_at < pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=args.older_than_days)
+    if args.where:
+        mask &= df.eval(args.where).astype(bool)
+
+    matches = df[mask]
+    print(f"{len(matches)} alerts match the filters and are not already {args.state}")
+    return [
+        {"repo": repo, "alert_type": alert_type, "number": str(number), "state": args.state,
+         "reason": args.dismissed_reason, "comment": args.dismissed_comment, "previous_result": None, "current_state": None}
+        for repo, number in zip(matches["repository_full_name"], matches["number"])
+    ]
+
+def run_batch(client, rows, source):
+    results_filename = args.results or f"{os.path.splitext(source)[0]}.results.csv"
+    print(f"{'Validating' if args.dry_run else 'Updating'} {len(rows)} alerts from {source} with {args.max_workers} workers...")
+
+    counts = {}
+    # Updates run concurrently; the shared client paces them against the rate limit and retries
+    # rate-limited and failed requests. Results are written in the order of the batch file.
+    with open(results_filename, 'w', newline='') as csvfile, ThreadPoolExecutor(max_workers=args.max_workers) as executor:
+        writer = csv.DictWriter(csvfile, fieldnames=RESULTS_FIELDS)
+        writer.writeheader()
+        for i, result in enumerate(executor.map(lambda row: process_batch_row(client, row, args.dry_run), rows), 1):
+            writer.writerow(result)
+            counts[result["result"]] = counts.get(result["result"], 0) + 1
+            if result["result"] in ["failed", "invalid"]:
+                print(f"{result['repo']} {result['alert_type']} #{result['number']}: {result['result']} {result['status_code'] or ''} {result['message']}")
+            if i % 100 == 0:
+                print(f"Processed {i} of {len(rows)} alerts")
+
+    if counts:
+        print(", ".join(f"{result}: {count}" for result, count in counts.items()))
+    print(f"Results have been written to {results_filename}. Run it again with --batch {results_filename} to retry the rows that were not updated.")
 
 # Define the headers
 headers = {
@@ -48,28 +236,33 @@ headers = {
     "Authorization": f"Bearer {args.gh_token}",
     "X-GitHub-Api-Version": "2022-11-28"
 }
+client = GitHubClient(headers=headers, pool_size=args.max_workers, retries=args.retries)
 
-# Define the data
-data = {
-    "state": args.state,
-    
-}
+if args.batch:
+    run_batch(client, read_batch(args.batch), args.batch)
+    client.rate_limiter.print_quota()
+    sys.exit(0)
+
+if args.snapshot:
+    if args.state is None:
+        parser.error("--state is required with --snapshot")
+    run_batch(client, select_snapshot_alerts(args.snapshot), args.snapshot)
+    client.rate_limiter.print_quota()
+    sys.exit(0)
 
-if args.state == "dismissed":
-    data["dismissed_reason"] = args.dismissed_reason
-    if args.dismissed_comment is not None:
-        data["dismissed_comment"] = args.dismissed_comment
+for required in ["repo", "alert_type", "state", "alert_number"]:
+    if getattr(args, required) is None:
+        parser.error(f"--{required} is required unless --batch or --snapshot is used")
 
-if args.alert_type == "secret-scanning" and args.state == "resolved":
-    data["resolution"] = args.dismissed_reason
-    if args.dismissed_comment is not None:
-        data["resolution_comment"] = args.dismissed_comment
+error = validate_update(args.alert_type, args.state, args.dismissed_reason, check_state=False)
+if error:
+    parser.error(error)
 
 # Make the API request
-response = requests.patch(url, headers=headers, json=data)
+response = update_alert(client, args.repo, args.alert_type, args.alert_number, build_update(args.alert_type, args.state, args.dismissed_reason, args.dismissed_comment))
 
 # Check the response
 if response.status_code == 200:
     print("Successfully updated the security alert.")
 else:
-    print(f"Failed to update the security alert. Status code: {response.status_code}. Response: {response.text}")
\ No newline at end of file
+    print(f"Failed to update the security alert. Status code: {response.status_code}. Response: {response.text}")